@@ -0,0 +1,32 @@
+from typing import Dict
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import get_current_user, get_user_role, is_user_active
+from app.db.session import get_db
+from app.utils.profiler import profiling_toggle
+
+profiling_router = APIRouter()
+
+
+@profiling_router.get("/status")
+async def profiling_status_api(db: Session = Depends(get_db), current_user: Dict = Depends(get_current_user)):
+    if not is_user_active(current_user, db):
+        return JSONResponse(status_code=401, content="Not active")
+    user_role = get_user_role(current_user, db)
+    if user_role not in [settings.default_admin_role]:
+        return JSONResponse(status_code=403, content="Not authorized")
+    return profiling_toggle.get()
+
+
+@profiling_router.post("/toggle", status_code=201)
+async def profiling_toggle_api(enabled: bool, sample_rate: float = settings.PROFILING_SAMPLE_RATE,
+                               db: Session = Depends(get_db), current_user: Dict = Depends(get_current_user)):
+    if not is_user_active(current_user, db):
+        return JSONResponse(status_code=401, content="Not active")
+    user_role = get_user_role(current_user, db)
+    if user_role not in [settings.default_admin_role]:
+        return JSONResponse(status_code=403, content="Not authorized")
+    return profiling_toggle.set(enabled, sample_rate)
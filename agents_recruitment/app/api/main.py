@@ -1,21 +1,34 @@
-from fastapi import FastAPI
+import threading
+import time
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.api.endpoints.job_endpoints import job_router
 from app.api.endpoints.user_endpoint import user_router
 from app.api.endpoints.candidate_endpoints import candidate_route
+from app.api.endpoints.profiling_endpoints import profiling_router
 from app.core.config import settings
 from app.utils.defaults import create_admin_account, display_startup_message
+from app.services.outbox_dispatcher import can_dispatch, outbox_dispatcher
 
+from app.db.schema import upgrade_schema
 from app.db.session import Base, engine
+from app.db.query_counter import check_query_budget, current_query_stats, query_scope
+from app.utils.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, render_metrics
+from app.utils.profiler import profile, should_profile
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     display_startup_message()
+    upgrade_schema(engine)
     create_admin_account()
+    if can_dispatch():
+        outbox_dispatcher.start()
     yield
+    outbox_dispatcher.stop()
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
@@ -24,6 +37,7 @@ Base.metadata.create_all(bind=engine)
 app.include_router(job_router, prefix="/job", tags=["job"])
 app.include_router(user_router, prefix="/user", tags=["user"])
 app.include_router(candidate_route, prefix="/candidate", tags=["candidate"])
+app.include_router(profiling_router, prefix="/profiling", tags=["profiling"])
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +47,67 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+@app.middleware("http")
+async def query_instrumentation(request: Request, call_next):
+    with query_scope(f"{request.method} {request.url.path}") as query_stats:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            query_stats["name"] = f"{request.method} {route.path}"
+    if route is not None:
+        check_query_budget(query_stats["name"], query_stats,
+                           settings.QUERY_BUDGETS.get(route.path, settings.DEFAULT_QUERY_BUDGET))
+    return response
+
+
+if settings.QUERY_COUNT_HEADER_ENABLED:
+
+    @app.middleware("http")
+    async def query_count_header(request: Request, call_next):
+        query_stats = current_query_stats()
+        queries_before = query_stats["queries"]
+        response = await call_next(request)
+        response.headers[settings.QUERY_COUNT_HEADER] = str(query_stats["queries"] - queries_before)
+        return response
+
+
+if settings.METRICS_ENABLED:
+
+    @app.middleware("http")
+    async def observe_http_latency(request: Request, call_next):
+        started_at = time.perf_counter()
+        with HTTP_IN_FLIGHT.track_inprogress():
+            response = await call_next(request)
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=response.status_code
+        ).observe(time.perf_counter() - started_at)
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        content, content_type = render_metrics()
+        return Response(content=content, media_type=content_type)
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if not should_profile(request.headers.get(settings.PROFILING_HEADER)):
+        return await call_next(request)
+
+    # Endpoints are async and call the services inline, so the event loop thread is where time goes.
+    # That thread is shared by every in-flight request, the profile is marked as loop-wide
+    with profile(f"{request.method} {request.url.path}", thread_ids={threading.get_ident()}) as report:
+        report["scope"] = "event_loop"
+        response = await call_next(request)
+        route = request.scope.get("route")
+        report["route"] = route.path if route is not None else None
+        report["status"] = response.status_code
+    response.headers["X-Profile-Id"] = report["profile_id"]
+    return response
+
 
 @app.get("/health")
 async def check_health():
@@ -1,5 +1,6 @@
 import os
 
+from typing import Dict
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -29,7 +30,60 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = os.getenv('MINIO_SECRET_KEY')
     MINIO_BUCKET_NAME: str = os.getenv('MINIO_BUCKET_NAME')
     
-    TMP_CANDIDATE_FILE: str = os.getenv('TMP_CANDIDATE_FILE')
+    CV_OBJECT_PREFIX: str = "cv"
+    MAX_CV_BYTES: int = int(os.getenv('MAX_CV_BYTES', str(20 * 1024 * 1024)))
+    CV_HASH_CHUNK_BYTES: int = 1024 * 1024
+
+    CORE_BASE_URL: str = os.getenv('CORE_BASE_URL', 'http://127.0.0.1:8001/recruitment_agent/core')
+    CORE_TOKEN: str = os.getenv('CORE_TOKEN', '')
+
+    OUTBOX_EVENT_CANDIDATE_APPLIED: str = "candidate_applied"
+    OUTBOX_STATUS_PENDING: str = "pending"
+    OUTBOX_STATUS_DISPATCHED: str = "dispatched"
+    OUTBOX_STATUS_FAILED: str = "failed"
+    # Off by default: without CORE_BASE_URL and CORE_TOKEN pointing at core every delivery fails
+    OUTBOX_DISPATCHER_ENABLED: bool = os.getenv('OUTBOX_DISPATCHER_ENABLED', 'false').lower() == 'true'
+    OUTBOX_BATCH_SIZE: int = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+    OUTBOX_POLL_INTERVAL_SECONDS: float = float(os.getenv('OUTBOX_POLL_INTERVAL_SECONDS', '2'))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '20'))
+    OUTBOX_RETRY_BASE_SECONDS: float = 2.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 300.0
+    OUTBOX_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    SLOW_QUERY_SECONDS: float = float(os.getenv('SLOW_QUERY_SECONDS', '0.2'))
+    # Identical statements repeated this often within one request are reported as a likely N+1
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))
+    # off, warn or raise; raise turns a request over its budget into a 500, meant for tests
+    QUERY_BUDGET_MODE: str = os.getenv('QUERY_BUDGET_MODE', 'warn')
+    DEFAULT_QUERY_BUDGET: int = 10
+    QUERY_BUDGETS: Dict[str, int] = {
+        "/job/get_jobs": 4,
+        "/job/get_job": 4,
+        "/candidate/display_non_eval_candidates": 6,
+        "/candidate/display_null_candidates": 4,
+        "/candidate/apply_job": 6,
+    }
+
+    # Adds an X-DB-Query-Count header to every response, used by the load-test harness
+    QUERY_COUNT_HEADER_ENABLED: bool = os.getenv('QUERY_COUNT_HEADER_ENABLED', 'false').lower() == 'true'
+    QUERY_COUNT_HEADER: str = "X-DB-Query-Count"
+
+    METRICS_ENABLED: bool = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+    # Profiles are taken for requests carrying PROFILING_HEADER=PROFILING_TOKEN, or for a
+    # PROFILING_SAMPLE_RATE share of requests while the toggle in PROFILING_DIR is on
+    PROFILING_DIR: str = os.getenv('PROFILING_DIR', 'profiles')
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_TOKEN: str = os.getenv('PROFILING_TOKEN', '')
+    PROFILING_ENABLED: bool = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SAMPLE_RATE: float = float(os.getenv('PROFILING_SAMPLE_RATE', '0.01'))
+    PROFILING_INTERVAL_SECONDS: float = float(os.getenv('PROFILING_INTERVAL_SECONDS', '0.005'))
+    PROFILING_TOP_STACKS: int = 30
+
+    LOADTEST_PREFIX: str = "loadtest"
+    LOADTEST_JOBS: int = 200
+    LOADTEST_CANDIDATES_PER_JOB: int = 250
+    LOADTEST_MIX: str = "get_jobs=5,display_non_eval_candidates=4,apply_job=1"
 
     @property
     def SQLALCHEMY_DATABASE_URI(self):
@@ -1,4 +1,4 @@
-from sqlalchemy import func, Column, Integer, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import func, Column, Integer, Text, DateTime, Boolean, ForeignKey, Float, JSON
 from app.db.session import Base
 
 
@@ -30,6 +30,7 @@ class Candidate(Base):
         "jobs.id", ondelete="SET NULL"))
     job_type = Column(Text, nullable=False)
     CV_directory = Column(Text)
+    cv_sha256 = Column(Text, index=True)
     extract_objective = Column(Text)
     extract_experiences = Column(Text)
     extract_skills = Column(Text)
@@ -37,6 +38,7 @@ class Candidate(Base):
     extract_certificate = Column(Text)
     score = Column(Float)
     summary_reason = Column(Text)
+    score_fingerprint = Column(Text)
     created_date = Column(DateTime, nullable=False, default=func.now())
     updated_date = Column(DateTime, nullable=False, default=func.now())
 
@@ -64,3 +66,18 @@ class Permission(Base):
                      index=True, nullable=False)
     created_date = Column(DateTime, nullable=False, default=func.now())
     updated_date = Column(DateTime, nullable=False, default=func.now())
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(Text, index=True, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Text, index=True, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, index=True, nullable=False, default=func.now())
+    last_error = Column(Text)
+    dispatched_date = Column(DateTime)
+    created_date = Column(DateTime, nullable=False, default=func.now())
+    updated_date = Column(DateTime, nullable=False, default=func.now())
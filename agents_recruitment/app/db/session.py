@@ -2,11 +2,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.query_counter import install_query_counter
+from app.utils.metrics import instrument_session_commits
 
 SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URI
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
+install_query_counter(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_session_commits(SessionLocal)
 
 Base = declarative_base()
 
@@ -0,0 +1,217 @@
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import SessionLocal
+from app.loadtest.seed import remove_load_data, seed_load_data
+
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for entry in mix.split(","):
+        name, _, weight = entry.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {sorted(unknown)}")
+    return weights
+
+
+def percentile(values: List[float], percent: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def synthetic_cv_pdf():
+    # A minimal valid PDF; the random comment keeps every upload's hash unique
+    return (
+        b"%PDF-1.4\n"
+        b"1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+        b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+        b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+        + f"% {uuid.uuid4().hex}\n".encode()
+        + b"trailer<</Root 1 0 R>>\n%%EOF\n"
+    )
+
+
+def multipart_body(field_name: str, file_name: str, content: bytes, content_type: str):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"{field_name}\"; filename=\"{file_name}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def get_jobs_request(context: Dict, rng: random.Random):
+    body = {
+        "filter_job": {"is_open": True} if rng.random() < 0.5 else {},
+        "pagination_base": {"limit": 20, "offset": rng.randrange(0, max(len(context["job_ids"]) - 20, 1))},
+    }
+    return "/job/get_jobs", {}, json.dumps(body).encode(), "application/json"
+
+
+def display_non_eval_candidates_request(context: Dict, rng: random.Random):
+    return "/candidate/display_non_eval_candidates", {"job_id": rng.choice(context["job_ids"])}, None, None
+
+
+def apply_job_request(context: Dict, rng: random.Random):
+    suffix = uuid.uuid4().hex[:8]
+    params = {
+        "name": f"{settings.LOADTEST_PREFIX} applicant {suffix}",
+        "email": f"applicant-{suffix}@{settings.LOADTEST_PREFIX}.example.com",
+        "phone_number": "0900000000",
+        "year_of_birth": 1995,
+        "job_id": rng.choice(context["open_job_ids"] or context["job_ids"]),
+    }
+    body, content_type = multipart_body("file_upload", f"{suffix}.pdf", synthetic_cv_pdf(), "application/pdf")
+    return "/candidate/apply_job", params, body, content_type
+
+
+ENDPOINTS = {
+    "get_jobs": get_jobs_request,
+    "display_non_eval_candidates": display_non_eval_candidates_request,
+    "apply_job": apply_job_request,
+}
+
+
+class LoadRecorder:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in ENDPOINTS}
+
+    def record(self, endpoint: str, latency: float, status: int, queries: int | None):
+        with self.lock:
+            self.samples[endpoint].append((latency, status, queries))
+
+    def report(self, wall_seconds: float):
+        report = {}
+        for endpoint, samples in self.samples.items():
+            if not samples:
+                continue
+            latencies = [latency for latency, _, _ in samples]
+            queries = [count for _, _, count in samples if count is not None]
+            report[endpoint] = {
+                "requests": len(samples),
+                "errors": sum(1 for _, status, _ in samples if status >= 500 or status == 0),
+                "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+                "mean_queries": sum(queries) / len(queries) if queries else None,
+                "max_queries": max(queries) if queries else None,
+            }
+            for percent in PERCENTILES:
+                report[endpoint][f"p{percent}_ms"] = percentile(latencies, percent) * 1000
+        return report
+
+
+def send_request(base_url: str, token: str, endpoint: str, context: Dict, rng: random.Random,
+                 recorder: LoadRecorder, timeout: float):
+    path, params, body, content_type = ENDPOINTS[endpoint](context, rng)
+    url = f"{base_url}{path}" + (f"?{urllib.parse.urlencode(params)}" if params else "")
+    request = urllib.request.Request(url, data=body or b"", method="POST")
+    request.add_header("Authorization", f"Bearer {token}")
+    if content_type:
+        request.add_header("Content-Type", content_type)
+
+    started_at = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        status, headers = e.code, e.headers
+    except Exception:
+        status, headers = 0, {}
+    latency = time.perf_counter() - started_at
+
+    queries = headers.get(settings.QUERY_COUNT_HEADER) if headers else None
+    recorder.record(endpoint, latency, status, int(queries) if queries is not None else None)
+
+
+def run_load(base_url: str, token: str, context: Dict, mix: Dict[str, float], concurrency: int,
+             duration_seconds: float, timeout: float, seed: int):
+    recorder = LoadRecorder()
+    deadline = time.perf_counter() + duration_seconds
+    endpoints, weights = zip(*mix.items())
+
+    def worker(worker_index: int):
+        rng = random.Random(seed + worker_index)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            send_request(base_url, token, endpoint, context, rng, recorder, timeout)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    return recorder.report(time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a request mix against a local HR API instance")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", default=settings.LOADTEST_MIX,
+                        help="Comma separated endpoint=weight, endpoints: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--jobs", type=int, default=settings.LOADTEST_JOBS)
+    parser.add_argument("--candidates-per-job", type=int, default=settings.LOADTEST_CANDIDATES_PER_JOB)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep-data", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    mix = parse_mix(args.mix)
+    db = SessionLocal()
+    try:
+        seeded = seed_load_data(db, args.jobs, args.candidates_per_job, args.seed)
+        # The token must outlive the run, the default expiry is 10 minutes
+        token = create_access_token({"sub": seeded["username"]},
+                                    expires_delta=timedelta(seconds=args.duration + 3600))
+        context = {"job_ids": seeded["job_ids"], "open_job_ids": seeded["open_job_ids"]}
+        logger.info(f"Seeded {len(seeded['job_ids'])} jobs x {args.candidates_per_job} candidates, "
+                    f"running {args.concurrency} workers for {args.duration:.0f}s")
+
+        report = run_load(args.base_url, token, context, mix, args.concurrency,
+                          args.duration, args.timeout, args.seed)
+        for endpoint, stats in report.items():
+            queries = (f"{stats['mean_queries']:.1f} queries/request (max {stats['max_queries']})"
+                       if stats["mean_queries"] is not None
+                       else "queries unknown, start the API with QUERY_COUNT_HEADER_ENABLED=true")
+            logger.info(
+                f"{endpoint}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"{stats['throughput_rps']:.1f} req/s, p50={stats['p50_ms']:.1f}ms "
+                f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms, {queries}"
+            )
+    finally:
+        if not args.keep_data:
+            removed = remove_load_data(db)
+            logger.info(f"Removed {removed} load test candidates")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
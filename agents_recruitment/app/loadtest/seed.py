@@ -0,0 +1,123 @@
+import datetime
+import random
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import get_hash_password
+from app.db.models import Candidate, Job, OutboxEvent, Permission, User
+from app.utils.minio import minio_agent_recruiment
+
+
+JOB_TYPES = ["Full-time", "Part-time", "Internship", "Contract"]
+LOCATIONS = ["Ha Noi", "Ho Chi Minh City", "Da Nang", "Remote"]
+TITLES = ["Backend Engineer", "Data Engineer", "Frontend Engineer", "QA Engineer", "DevOps Engineer",
+          "Product Analyst", "Machine Learning Engineer", "Mobile Developer"]
+
+
+def loadtest_username():
+    return f"{settings.LOADTEST_PREFIX}_hr"
+
+
+def seed_load_data(db: Session, jobs: int = settings.LOADTEST_JOBS,
+                   candidates_per_job: int = settings.LOADTEST_CANDIDATES_PER_JOB, seed: int = 7):
+    """Create an active HR user with permission on a realistic volume of jobs and candidates."""
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        user = db.query(User).filter(User.username == loadtest_username()).first()
+        if not user:
+            user = User(
+                name=loadtest_username(),
+                username=loadtest_username(),
+                hash_password=get_hash_password(loadtest_username()),
+                role=settings.default_HR_role,
+                is_active=True,
+                created_date=now,
+                updated_date=now
+            )
+            db.add(user)
+            db.flush()
+
+        job_rows = db.execute(insert(Job).returning(Job.id, Job.is_open), [
+            {
+                "title": f"{settings.LOADTEST_PREFIX} {rng.choice(TITLES)} {index}",
+                "job_type": rng.choice(JOB_TYPES),
+                "qualifications": "Three or more years of professional experience; " * 4,
+                "responsibilities": "Design, build and maintain services used by the recruitment team. " * 4,
+                "benefits": "Competitive salary, insurance, annual leave.",
+                "work_schedule": "Monday to Friday",
+                "location": rng.choice(LOCATIONS),
+                "is_open": rng.random() < 0.8,
+                "created_date": now,
+                "updated_date": now,
+            }
+            for index in range(jobs)
+        ]).all()
+        job_ids = [job_id for job_id, _ in job_rows]
+
+        db.execute(insert(Permission), [
+            {"job_id": job_id, "user_id": user.id, "created_date": now, "updated_date": now}
+            for job_id in job_ids
+        ])
+
+        for job_id in job_ids:
+            db.execute(insert(Candidate), [
+                {
+                    "name": f"{settings.LOADTEST_PREFIX} candidate {job_id}-{index}",
+                    "phone_number": f"09{rng.randrange(10 ** 8):08d}",
+                    "email": f"{job_id}-{index}@{settings.LOADTEST_PREFIX}.example.com",
+                    "year_of_birth": rng.randint(1975, 2003),
+                    "job_id": job_id,
+                    "job_type": JOB_TYPES[job_id % len(JOB_TYPES)],
+                    "CV_directory": f"{settings.CV_OBJECT_PREFIX}/{settings.LOADTEST_PREFIX}-{job_id}-{index}.pdf",
+                    "extract_skills": "Python, SQL, Docker" if rng.random() < 0.7 else None,
+                    # Roughly half of the candidates are still waiting for evaluation
+                    "score": rng.uniform(0, 100) if rng.random() < 0.5 else None,
+                    "created_date": now,
+                    "updated_date": now,
+                }
+                for index in range(candidates_per_job)
+            ])
+
+        db.commit()
+        return {
+            "username": loadtest_username(),
+            "user_id": user.id,
+            "job_ids": job_ids,
+            "open_job_ids": [job_id for job_id, is_open in job_rows if is_open],
+        }
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in seed load test data", e)
+
+
+def remove_load_data(db: Session):
+    try:
+        candidates = db.query(Candidate.id, Candidate.CV_directory).filter(
+            Candidate.email.like(f"%@{settings.LOADTEST_PREFIX}.example.com")
+        ).all()
+        uploaded_objects = {cv_directory for _, cv_directory in candidates
+                            if cv_directory and f"/{settings.LOADTEST_PREFIX}-" not in cv_directory}
+
+        # apply_job queued an outbox event per applicant, a dispatcher must not deliver them later
+        db.query(OutboxEvent).filter(
+            OutboxEvent.payload["candidate_id"].as_integer().in_([candidate_id for candidate_id, _ in candidates])
+        ).delete(synchronize_session=False)
+        db.query(Candidate).filter(
+            Candidate.email.like(f"%@{settings.LOADTEST_PREFIX}.example.com")
+        ).delete(synchronize_session=False)
+        db.query(Job).filter(
+            Job.title.like(f"{settings.LOADTEST_PREFIX} %")
+        ).delete(synchronize_session=False)
+        db.query(User).filter(User.username == loadtest_username()).delete(synchronize_session=False)
+        db.commit()
+
+        # Only CVs uploaded through apply_job during the run exist in MinIO
+        for object_name in uploaded_objects:
+            minio_agent_recruiment.delete_file(object_name)
+        return len(candidates)
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in remove load test data", e)
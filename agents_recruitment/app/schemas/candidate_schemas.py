@@ -11,6 +11,7 @@ class CandidateBase(BaseModel):
     job_id: Optional[int] = None
     job_type: str
     CV_directory: Optional[str] = None
+    cv_sha256: Optional[str] = None
     extract_objective: Optional[str] = None
     extract_experiences: Optional[str] = None
     extract_skills: Optional[str] = None
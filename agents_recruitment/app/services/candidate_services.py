@@ -2,14 +2,15 @@ import datetime
 from typing import List
 
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import delete
+from sqlalchemy import delete, func
 
-from app.db.models import Candidate, Job
-from app.utils.defaults import format_candidate_name
+from app.db.models import Candidate, Job, OutboxEvent
 from app.core.config import settings
-from app.utils.minio import minio_agent_recruiment
+from app.utils.minio import UploadTooLarge, hash_upload, minio_agent_recruiment
+from app.services.outbox_dispatcher import outbox_dispatcher
 from app.schemas.candidate_schemas import CandidateResponse, CandidateUpdate
 
 
@@ -22,6 +23,19 @@ async def apply_job(name: str, email: str, phone_number: str, year_of_birth: int
         if not job.is_open:
             return JSONResponse(status_code=400, content="Cannot apply this job")
 
+        if file_upload.size is not None and file_upload.size > settings.MAX_CV_BYTES:
+            return JSONResponse(status_code=413, content=f"CV is larger than {settings.MAX_CV_BYTES} bytes")
+
+        # Starlette has spooled the upload to this request's own temporary file; it is hashed and
+        # stored off the event loop, in chunks, straight under its content-addressed key
+        try:
+            cv_sha256, cv_size = await run_in_threadpool(hash_upload, file_upload.file, settings.MAX_CV_BYTES)
+        except UploadTooLarge as e:
+            return JSONResponse(status_code=413, content=str(e))
+        # Identical CVs share one object, already stored ones are not uploaded again
+        object_name = f"{settings.CV_OBJECT_PREFIX}/{cv_sha256}.pdf"
+        await run_in_threadpool(minio_agent_recruiment.put_if_missing, object_name, file_upload.file, cv_size)
+
         new_candidate = Candidate(
             name=name,
             email=email,
@@ -29,25 +43,26 @@ async def apply_job(name: str, email: str, phone_number: str, year_of_birth: int
             phone_number=phone_number,
             job_id=job_id,
             job_type=job.job_type,
+            CV_directory=object_name,
+            cv_sha256=cv_sha256,
             created_date=datetime.datetime.now(datetime.timezone.utc),
             updated_date=datetime.datetime.now(datetime.timezone.utc),
         )
         db.add(new_candidate)
         db.flush()
 
-        current_id = new_candidate.id
-        candidate_name = format_candidate_name(name)
-        object_name = f"{current_id}/{candidate_name}.pdf"
-
-        with open(settings.TMP_CANDIDATE_FILE, "wb") as buffer:
-            content = await file_upload.read()
-            buffer.write(content)
-
-        minio_agent_recruiment.upload_file(
-            settings.TMP_CANDIDATE_FILE, object_name)
-        new_candidate.CV_directory = object_name
-
+        # Committed together with the candidate, the dispatcher delivers it to core for extraction
+        db.add(OutboxEvent(
+            event_type=settings.OUTBOX_EVENT_CANDIDATE_APPLIED,
+            payload={"candidate_id": new_candidate.id},
+            status=settings.OUTBOX_STATUS_PENDING,
+            attempts=0,
+            available_at=func.now(),
+            created_date=datetime.datetime.now(datetime.timezone.utc),
+            updated_date=datetime.datetime.now(datetime.timezone.utc),
+        ))
         db.commit()
+        outbox_dispatcher.wake_up()
 
         return new_candidate
     except Exception as e:
@@ -177,6 +192,7 @@ def delete_candidates_from_system(candidate_ids: List[int], db: Session):
                 job_id=candidate.job_id,
                 job_type=candidate.job_type,
                 CV_directory=candidate.CV_directory,
+                cv_sha256=candidate.cv_sha256,
                 extract_objective=candidate.extract_objective,
                 extract_experiences=candidate.extract_experiences,
                 extract_skills=candidate.extract_skills,
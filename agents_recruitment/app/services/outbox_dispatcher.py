@@ -0,0 +1,174 @@
+import datetime
+import json
+import logging
+import threading
+import urllib.request
+
+from typing import List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import OutboxEvent
+from app.db.session import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay_seconds(attempts: int):
+    return min(
+        settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+        settings.OUTBOX_RETRY_MAX_SECONDS
+    )
+
+
+def claim_outbox_events(db: Session, batch_size: int = settings.OUTBOX_BATCH_SIZE):
+    # Rows stay locked until the caller commits, so concurrent dispatchers skip them
+    return db.query(OutboxEvent).filter(
+        OutboxEvent.status == settings.OUTBOX_STATUS_PENDING,
+        OutboxEvent.available_at <= func.now(),
+    ).order_by(OutboxEvent.id) \
+        .with_for_update(skip_locked=True) \
+        .limit(batch_size) \
+        .all()
+
+
+def post_to_core(path: str, body):
+    request = urllib.request.Request(
+        f"{settings.CORE_BASE_URL}{path}",
+        data=json.dumps(body).encode("utf-8"),
+        method="POST",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {settings.CORE_TOKEN}"},
+    )
+    with urllib.request.urlopen(request, timeout=settings.OUTBOX_HTTP_TIMEOUT_SECONDS) as response:
+        return json.loads(response.read() or b"null")
+
+
+def deliver_candidate_applied(events: List[OutboxEvent]):
+    # Core deduplicates on the key, so a batch redelivered after a lost response is not enqueued twice
+    return post_to_core("/extract_candidates_cv/", {
+        "candidate_ids": [event.payload["candidate_id"] for event in events],
+        "dedupe_keys": [f"hr_outbox:{event.id}" for event in events],
+    })
+
+
+EVENT_DELIVERERS = {
+    settings.OUTBOX_EVENT_CANDIDATE_APPLIED: deliver_candidate_applied,
+}
+
+
+def mark_failed_delivery(events: List[OutboxEvent], error: str):
+    for event in events:
+        event.attempts += 1
+        event.last_error = error
+        event.updated_date = datetime.datetime.now(datetime.timezone.utc)
+        if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            event.status = settings.OUTBOX_STATUS_FAILED
+        else:
+            event.available_at = func.now() + datetime.timedelta(seconds=retry_delay_seconds(event.attempts))
+
+
+def dispatch_outbox_batch(db: Session):
+    try:
+        events = claim_outbox_events(db)
+        if not events:
+            db.commit()
+            return 0
+
+        by_type = {}
+        for event in events:
+            by_type.setdefault(event.event_type, []).append(event)
+
+        for event_type, typed_events in by_type.items():
+            deliverer = EVENT_DELIVERERS.get(event_type)
+            try:
+                if deliverer is None:
+                    raise Exception(f"No deliverer for outbox event type {event_type}")
+                deliverer(typed_events)
+            except Exception as e:
+                logger.error(f"Delivering {len(typed_events)} {event_type} outbox events failed: {e}")
+                mark_failed_delivery(typed_events, repr(e))
+                continue
+
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for event in typed_events:
+                event.status = settings.OUTBOX_STATUS_DISPATCHED
+                event.attempts += 1
+                event.last_error = None
+                event.dispatched_date = now
+                event.updated_date = now
+
+        db.commit()
+        return len(events)
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in dispatch outbox batch", e)
+
+
+class OutboxDispatcher(threading.Thread):
+    """Polls the outbox and delivers due events; apply_job wakes it up so new rows go out at once."""
+
+    def __init__(self, poll_interval: float = settings.OUTBOX_POLL_INTERVAL_SECONDS):
+        super().__init__(daemon=True, name="outbox-dispatcher")
+        self.poll_interval = poll_interval
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+
+    def wake_up(self):
+        self.wake_event.set()
+
+    def run(self):
+        logger.info("Outbox dispatcher started")
+        while not self.stop_event.is_set():
+            db = SessionLocal()
+            try:
+                dispatched = dispatch_outbox_batch(db)
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {e}")
+                dispatched = 0
+            finally:
+                db.close()
+
+            # A full batch means more rows may be waiting
+            if dispatched < settings.OUTBOX_BATCH_SIZE:
+                self.wake_event.wait(self.poll_interval)
+                self.wake_event.clear()
+        logger.info("Outbox dispatcher stopped")
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.is_alive():
+            self.join()
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+def can_dispatch(require_enabled: bool = True):
+    if require_enabled and not settings.OUTBOX_DISPATCHER_ENABLED:
+        logger.warning("Outbox dispatcher disabled, new applicants stay pending until OUTBOX_DISPATCHER_ENABLED=true")
+        return False
+    if not settings.CORE_TOKEN:
+        logger.warning("Outbox dispatcher not started: CORE_TOKEN is empty, every delivery to core would be rejected")
+        return False
+    return True
+
+
+def main():
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    # Running the dispatcher on its own is an explicit opt-in, only the token is required
+    if not can_dispatch(require_enabled=False):
+        raise SystemExit(1)
+    dispatcher = OutboxDispatcher()
+    dispatcher.start()
+    try:
+        dispatcher.join()
+    except KeyboardInterrupt:
+        dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import time
+
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "hr_http_request_seconds", "HTTP request latency per route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "hr_http_in_flight", "HTTP requests currently being served"
+)
+MINIO_UPLOAD_SECONDS = Histogram(
+    "hr_minio_upload_seconds", "Time to upload a CV to MinIO", buckets=LATENCY_BUCKETS
+)
+MINIO_UPLOAD_BYTES = Histogram(
+    "hr_minio_upload_bytes", "Size of CVs uploaded to MinIO", buckets=BYTES_BUCKETS
+)
+DB_COMMIT_SECONDS = Histogram(
+    "hr_db_commit_seconds", "Time spent in session commits", buckets=LATENCY_BUCKETS
+)
+
+
+@contextmanager
+def observe_seconds(histogram):
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started_at)
+
+
+def instrument_session_commits(session_factory):
+
+    @event.listens_for(session_factory, "before_commit")
+    def start_commit_timer(session):
+        session.info["commit_started_at"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_commit")
+    def observe_commit(session):
+        started_at = session.info.pop("commit_started_at", None)
+        if started_at is not None:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started_at)
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,13 +1,33 @@
+import hashlib
 import logging
 
 from minio import Minio
 from minio.error import S3Error
 
 from app.core.config import settings
+from app.utils.metrics import MINIO_UPLOAD_BYTES, MINIO_UPLOAD_SECONDS, observe_seconds
 
 logger = logging.getLogger(__name__)
 
 
+class UploadTooLarge(Exception):
+    pass
+
+
+def hash_upload(stream, max_bytes: int, chunk_size: int = settings.CV_HASH_CHUNK_BYTES):
+    # One chunked pass over the request's spooled upload, the sha256 names the object before it is stored
+    sha256 = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    while chunk := stream.read(chunk_size):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+        sha256.update(chunk)
+    stream.seek(0)
+    return sha256.hexdigest(), size
+
+
 class MinioForAgentRecruiment:
 
     def __init__(
@@ -29,11 +49,25 @@ class MinioForAgentRecruiment:
         if not self.client.bucket_exists(bucket_name):
             self.client.make_bucket(bucket_name)
 
-    def upload_file(self, file_path: str, object_name: str):
+    def put_stream(self, object_name: str, stream, length: int, content_type: str = "application/pdf"):
+        # With a known length the client sends one PUT, or multipart parts of bounded size for large files
+        with observe_seconds(MINIO_UPLOAD_SECONDS):
+            self.client.put_object(self.bucket_name, object_name, stream, length, content_type=content_type)
+        MINIO_UPLOAD_BYTES.observe(length)
+
+    def put_if_missing(self, object_name: str, stream, length: int):
+        # Content-addressed objects with the same name hold the same bytes
+        if not self.object_exists(object_name):
+            self.put_stream(object_name, stream, length)
+
+    def object_exists(self, object_name: str):
         try:
-            self.client.fput_object(self.bucket_name, object_name, file_path)
+            self.client.stat_object(self.bucket_name, object_name)
+            return True
         except S3Error as e:
-            logger.error("Error when upload file to Minio", e)
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
 
     def download_file(self, file_path: str, object_name: str):
         try:
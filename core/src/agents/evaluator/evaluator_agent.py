@@ -1,19 +1,30 @@
 import json
+import hashlib
 import logging
 import datetime
+import threading
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
-from src.settings.settings import GeneralCoreSettings, OpenAISettings
+from src.settings.settings import GeneralCoreSettings, OpenAISettings, EvaluatorSettings, PrescreenSettings
 from src.db.models import Candidate, Job
-from src.agents.evaluator.schemas import JobInfo, CandidateInfo
+from src.db.query_counter import with_query_stats
+from src.db.session import SessionLocal
+from src.agents.evaluator.schemas import JobInfo, JobContext, CandidateInfo, CandidateEvaluationResult
 from src.agents.evaluator.prompts import EvaluatorPrompt
+from src.agents.prescreen.prescreen_agent import prescreen_candidates
 from src.utils.openai_client import recruitment_openai
+from src.utils.text_compactor import count_tokens
 
 logger = logging.getLogger(__name__)
 
+# Compiled job contexts, invalidated when Job.updated_date moves
+_job_context_cache: Dict[int, JobContext] = {}
+_job_context_lock = threading.Lock()
+
 def get_job_info(job_id: int, db: Session):
     try:
         job = db.query(Job).filter(Job.id == job_id).first()
@@ -34,6 +45,39 @@ def get_job_info(job_id: int, db: Session):
 
 
 
+def get_job_context(job_id: int, db: Session):
+    try:
+        updated_date = db.query(Job.updated_date).filter(Job.id == job_id).scalar()
+        if updated_date is None:
+            return JSONResponse(status_code=404, content="Job not found")
+
+        with _job_context_lock:
+            job_context = _job_context_cache.get(job_id)
+        if job_context and job_context.updated_date == updated_date:
+            return job_context
+
+        job_info = get_job_info(job_id, db)
+        if not isinstance(job_info, JobInfo):
+            return job_info
+
+        job_context = JobContext(
+            job_id=job_id,
+            updated_date=updated_date,
+            job_info=job_info,
+            job_section=EvaluatorPrompt.job_preparation(job_info),
+        )
+        with _job_context_lock:
+            _job_context_cache[job_id] = job_context
+
+        return job_context
+    except Exception as e:
+        raise Exception("Error occured in get job context", e)
+
+
+def job_usage_key(job_id: int):
+    return f"job:{job_id}"
+
+
 def get_candidate_info(candidate_id: int, db: Session):
     try:
         candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
@@ -51,7 +95,40 @@ def get_candidate_info(candidate_id: int, db: Session):
         raise Exception("Error occured in get candidate info", e)
 
 
-def save_eval_2_db(candidate_id: int, score: int, summary_reason: str, db: Session):
+def get_candidates_info(candidate_ids: List[int], db: Session):
+    try:
+        rows = db.query(
+            Candidate.id,
+            Candidate.extract_objective,
+            Candidate.extract_experiences,
+            Candidate.extract_skills,
+            Candidate.extract_education,
+            Candidate.extract_certificate,
+        ).filter(Candidate.id.in_(candidate_ids)).all()
+
+        return {
+            row.id: {key: value for key, value in row._mapping.items() if key != "id"}
+            for row in rows
+        }
+    except Exception as e:
+        raise Exception("Error occured in get candidates info", e)
+
+
+def score_fingerprint(job_context: JobContext, candidate_info: CandidateInfo, evaluation_mode: str):
+    # Everything the score depends on: the prompt version, the mode (packed uses other prompts),
+    # the model, the job fields and the candidate's extract_* fields
+    return hashlib.sha256(json.dumps({
+        "prompt_version": EvaluatorPrompt.VERSION,
+        "evaluation_mode": evaluation_mode,
+        "model": OpenAISettings.MODEL,
+        "job_id": job_context.job_id,
+        "job": job_context.job_info.model_dump(),
+        "candidate": candidate_info.model_dump(),
+    }, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def save_eval_2_db(candidate_id: int, score: int, summary_reason: str, db: Session,
+                   fingerprint: str | None = None):
     try:
         candidate = db.query(Candidate).filter(Candidate.id == candidate_id).first()
         if not candidate:
@@ -59,6 +136,7 @@ def save_eval_2_db(candidate_id: int, score: int, summary_reason: str, db: Sessi
 
         candidate.score = score
         candidate.summary_reason = summary_reason
+        candidate.score_fingerprint = fingerprint
         candidate.updated_date = datetime.datetime.now(datetime.timezone.utc)
 
         db.flush()
@@ -69,33 +147,297 @@ def save_eval_2_db(candidate_id: int, score: int, summary_reason: str, db: Sessi
         raise Exception("Error occured in save evaluation to DB", e)
 
 
-def evaluate_candidates(candidate_ids: List[int], job_id: int, db: Session):
-    for candidate_id in candidate_ids:
-        candidate_info = get_candidate_info(candidate_id, db)
-        job_info = get_job_info(job_id, db)
-        
-        evaluate_candidate_prompt = EvaluatorPrompt.evaluate_candidate_prompt(
-            candidate_info=candidate_info,
-            job_info=job_info
-        )
-        
-        evaluation_result = recruitment_openai.get_completions(
-            prompts=evaluate_candidate_prompt,
+def parse_evaluation(completion: str):
+    # Raises on malformed answers so they are never cached
+    json_eval_data = json.loads(completion)
+    if GeneralCoreSettings.SCORE not in json_eval_data or GeneralCoreSettings.SUMMARY_REASON not in json_eval_data:
+        raise ValueError(f"Evaluation is missing {GeneralCoreSettings.SCORE} or {GeneralCoreSettings.SUMMARY_REASON}")
+    return json_eval_data
+
+
+def parse_evaluation_pack(completion: str):
+    return json.loads(completion)[EvaluatorSettings.EVALUATIONS]
+
+
+def evaluate_candidate(candidate_id: int, candidate_row: Dict | None, job_context: JobContext):
+    db = SessionLocal()
+    try:
+        if candidate_row is None:
+            raise Exception("Candidate not found")
+        candidate_info = CandidateInfo(**candidate_row)
+
+        json_eval_data = recruitment_openai.get_completions(
+            prompts=EvaluatorPrompt.candidate_prompt(candidate_info),
+            prefix_prompts=EvaluatorPrompt.evaluation_instructions_prompt(job_context.job_section),
             system_role=OpenAISettings.SYSTEM_ROLE,
-            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EVALUATION
+            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EVALUATION,
+            usage_key=job_usage_key(job_context.job_id),
+            parse=parse_evaluation
         )
-        
-        json_eval_data = json.loads(evaluation_result)
-    
-        save_eval_2_db(
+
+        saved = save_eval_2_db(
             candidate_id=candidate_id,
             score=json_eval_data[GeneralCoreSettings.SCORE],
             summary_reason=json_eval_data[GeneralCoreSettings.SUMMARY_REASON],
-            db=db
+            db=db,
+            fingerprint=score_fingerprint(job_context, candidate_info, EvaluatorSettings.EVALUATION_MODE_SINGLE)
         )
-        
+        if not isinstance(saved, Candidate):
+            raise Exception(saved.body.decode())
+
         logger.info(json_eval_data)
 
-        return json_eval_data
+        return CandidateEvaluationResult(
+            candidate_id=candidate_id,
+            success=True,
+            score=json_eval_data[GeneralCoreSettings.SCORE],
+            summary_reason=json_eval_data[GeneralCoreSettings.SUMMARY_REASON],
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Evaluation failed for candidate {candidate_id}: {e}")
+        return CandidateEvaluationResult(
+            candidate_id=candidate_id,
+            success=False,
+            error=str(e),
+        )
+    finally:
+        db.close()
+
+
+def split_pack(pack: List, job_context: JobContext,
+               max_prompt_tokens: int = EvaluatorSettings.PACK_MAX_PROMPT_TOKENS):
+    prompt_tokens = count_tokens(EvaluatorPrompt.evaluation_pack_instructions_prompt(job_context.job_section)) \
+        + count_tokens(EvaluatorPrompt.candidates_pack_prompt(pack))
+    if len(pack) <= 1 or prompt_tokens <= max_prompt_tokens:
+        return [pack]
+
+    middle = len(pack) // 2
+    return split_pack(pack[:middle], job_context, max_prompt_tokens) \
+        + split_pack(pack[middle:], job_context, max_prompt_tokens)
+
+
+def build_packs(candidate_infos: Dict[int, CandidateInfo], job_context: JobContext,
+                pack_size: int = EvaluatorSettings.PACK_SIZE):
+    candidates = list(candidate_infos.items())
+    pack_size = max(1, pack_size)
+    packs = []
+    for start in range(0, len(candidates), pack_size):
+        packs.extend(split_pack(candidates[start:start + pack_size], job_context))
+    return packs
+
+
+def evaluate_pack(pack: List, candidate_rows: Dict[int, Dict], job_context: JobContext):
+    db = SessionLocal()
+    results = []
+    evaluations = {}
+    try:
+        pack_evaluations = recruitment_openai.get_completions(
+            prompts=EvaluatorPrompt.candidates_pack_prompt(pack),
+            prefix_prompts=EvaluatorPrompt.evaluation_pack_instructions_prompt(job_context.job_section),
+            system_role=OpenAISettings.SYSTEM_ROLE,
+            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EVALUATION,
+            response_format=EvaluatorPrompt.evaluation_pack_response_format(),
+            usage_key=job_usage_key(job_context.job_id),
+            parse=parse_evaluation_pack
+        )
+        for evaluation in pack_evaluations:
+            evaluations[evaluation[EvaluatorSettings.CANDIDATE_ID]] = evaluation
+    except Exception as e:
+        logger.error(f"Packed evaluation of {[candidate_id for candidate_id, _ in pack]} failed: {e}")
+
+    try:
+        for candidate_id, candidate_info in pack:
+            evaluation = evaluations.get(candidate_id)
+            if evaluation is None:
+                continue
+            try:
+                saved = save_eval_2_db(
+                    candidate_id=candidate_id,
+                    score=evaluation[GeneralCoreSettings.SCORE],
+                    summary_reason=evaluation[GeneralCoreSettings.SUMMARY_REASON],
+                    db=db,
+                    fingerprint=score_fingerprint(job_context, candidate_info, EvaluatorSettings.EVALUATION_MODE_PACKED)
+                )
+                if not isinstance(saved, Candidate):
+                    # The row is gone, scoring it again one by one would not help
+                    results.append(CandidateEvaluationResult(
+                        candidate_id=candidate_id,
+                        success=False,
+                        error=saved.body.decode(),
+                    ))
+                    continue
+                results.append(CandidateEvaluationResult(
+                    candidate_id=candidate_id,
+                    success=True,
+                    score=evaluation[GeneralCoreSettings.SCORE],
+                    summary_reason=evaluation[GeneralCoreSettings.SUMMARY_REASON],
+                ))
+            except Exception as e:
+                db.rollback()
+                evaluations.pop(candidate_id)
+                logger.error(f"Saving packed evaluation for candidate {candidate_id} failed: {e}")
+    finally:
+        db.close()
+
+    # Candidates the model skipped or that failed to save are scored one by one
+    missing_ids = [candidate_id for candidate_id, _ in pack if candidate_id not in evaluations]
+    if missing_ids:
+        logger.info(f"Retrying {missing_ids} individually for job {job_context.job_id}")
+    for candidate_id in missing_ids:
+        results.append(evaluate_candidate(candidate_id, candidate_rows.get(candidate_id), job_context))
+
+    return results
+
+
+def evaluate_candidates_packed(candidate_ids: List[int], candidate_rows: Dict[int, Dict],
+                               job_context: JobContext, max_in_flight: int):
+    results = {}
+    candidate_infos = {}
+    for candidate_id in dict.fromkeys(candidate_ids):
+        try:
+            if candidate_rows.get(candidate_id) is None:
+                raise Exception("Candidate not found")
+            candidate_infos[candidate_id] = CandidateInfo(**candidate_rows[candidate_id])
+        except Exception as e:
+            results[candidate_id] = CandidateEvaluationResult(
+                candidate_id=candidate_id, success=False, error=str(e)
+            )
+
+    packs = build_packs(candidate_infos, job_context)
+    max_workers = max(1, min(max_in_flight, len(packs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for pack_results in executor.map(
+            with_query_stats(lambda pack: evaluate_pack(pack, candidate_rows, job_context)), packs
+        ):
+            for result in pack_results:
+                results[result.candidate_id] = result
+
+    return [results[candidate_id] for candidate_id in dict.fromkeys(candidate_ids)]
+
+
+def evaluate_candidates(candidate_ids: List[int], job_id: int, db: Session,
+                        max_in_flight: int = EvaluatorSettings.MAX_IN_FLIGHT,
+                        evaluation_mode: str | None = None,
+                        prescreen_top_n: int | None = PrescreenSettings.DEFAULT_TOP_N,
+                        prescreen_min_score: float | None = PrescreenSettings.DEFAULT_MIN_SCORE):
+    evaluation_mode = evaluation_mode or EvaluatorSettings.EVALUATION_MODE
+    if evaluation_mode not in EvaluatorSettings.EVALUATION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown evaluation mode {evaluation_mode}")
+
+    job_context = get_job_context(job_id, db)
+    if not isinstance(job_context, JobContext):
+        return job_context
+
+    skipped_results = []
+    prescreen_scores = {}
+    if prescreen_top_n is not None or prescreen_min_score is not None:
+        prescreen = prescreen_candidates(job_id, candidate_ids, db, prescreen_top_n, prescreen_min_score)
+        if isinstance(prescreen, JSONResponse):
+            return prescreen
+        prescreen_scores = prescreen["scores"]
+        shortlisted = set(prescreen["shortlisted"])
+        skipped_results = [
+            CandidateEvaluationResult(
+                candidate_id=candidate_id,
+                success=False,
+                skipped=True,
+                prescreen_score=prescreen_scores.get(candidate_id),
+            )
+            for candidate_id in candidate_ids if candidate_id not in shortlisted
+        ]
+        candidate_ids = [candidate_id for candidate_id in candidate_ids if candidate_id in shortlisted]
+        logger.info(f"Prescreen kept {len(candidate_ids)} and skipped {len(skipped_results)} candidates for job {job_id}")
+
+    candidate_rows = get_candidates_info(candidate_ids, db)
+    usage_before = recruitment_openai.usage.snapshot(job_usage_key(job_id))
+
+    if evaluation_mode == EvaluatorSettings.EVALUATION_MODE_PACKED:
+        results = evaluate_candidates_packed(candidate_ids, candidate_rows, job_context, max_in_flight)
+    else:
+        # Each worker owns its session, the OpenAI client is shared across threads
+        max_workers = max(1, min(max_in_flight, len(candidate_ids)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                with_query_stats(lambda candidate_id: evaluate_candidate(
+                    candidate_id, candidate_rows.get(candidate_id), job_context
+                )),
+                candidate_ids
+            ))
+    for result in results:
+        result.prescreen_score = prescreen_scores.get(result.candidate_id)
+
+    failed = [result.candidate_id for result in results if not result.success]
+    logger.info(
+        f"Evaluated {len(results) - len(failed)}/{len(results)} candidates for job {job_id} "
+        f"(mode={evaluation_mode})"
+        + (f", failed: {failed}" if failed else "")
+    )
+    usage = recruitment_openai.usage.report(job_usage_key(job_id), since=usage_before)
+    logger.info(
+        f"Job {job_id} LLM usage for this run: {usage['prompt_tokens']} prompt tokens "
+        f"({usage['cached_prompt_tokens']} cached, hit ratio {usage['cache_hit_ratio']:.1%}), "
+        f"{usage['completion_tokens']} completion tokens over {usage['calls']} calls"
+    )
+
+    return results + skipped_results
+
+
+def find_stale_candidates(job_id: int, job_context: JobContext, evaluation_mode: str, db: Session):
+    try:
+        rows = db.query(
+            Candidate.id,
+            Candidate.score,
+            Candidate.score_fingerprint,
+            Candidate.extract_objective,
+            Candidate.extract_experiences,
+            Candidate.extract_skills,
+            Candidate.extract_education,
+            Candidate.extract_certificate,
+        ).filter(Candidate.job_id == job_id, Candidate.extract_skills.is_not(None)).order_by(Candidate.id).all()
+
+        stale_ids = []
+        for row in rows:
+            try:
+                candidate_info = CandidateInfo(**{
+                    key: value for key, value in row._mapping.items()
+                    if key not in ("id", "score", "score_fingerprint")
+                })
+            except Exception:
+                continue
+            if row.score is None or row.score_fingerprint != score_fingerprint(job_context, candidate_info, evaluation_mode):
+                stale_ids.append(row.id)
+
+        return stale_ids, len(rows) - len(stale_ids)
+    except Exception as e:
+        raise Exception("Error occured in find stale candidates", e)
+
+
+def refresh_job_scores(job_id: int, db: Session,
+                       max_in_flight: int = EvaluatorSettings.MAX_IN_FLIGHT,
+                       evaluation_mode: str | None = None):
+    evaluation_mode = evaluation_mode or EvaluatorSettings.EVALUATION_MODE
+    if evaluation_mode not in EvaluatorSettings.EVALUATION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown evaluation mode {evaluation_mode}")
+    job_context = get_job_context(job_id, db)
+    if not isinstance(job_context, JobContext):
+        return job_context
+
+    stale_ids, fresh_count = find_stale_candidates(job_id, job_context, evaluation_mode, db)
+    logger.info(f"Job {job_id}: {len(stale_ids)} stale scores to refresh, {fresh_count} up to date")
+    if not stale_ids:
+        return {"job_id": job_id, "evaluated": 0, "failed": 0, "skipped": fresh_count, "results": []}
+
+    results = evaluate_candidates(stale_ids, job_id, db, max_in_flight, evaluation_mode,
+                                  prescreen_top_n=None, prescreen_min_score=None)
+    if isinstance(results, JSONResponse):
+        return results
 
-        
\ No newline at end of file
+    failed = sum(1 for result in results if not result.success)
+    return {
+        "job_id": job_id,
+        "evaluated": len(results) - failed,
+        "failed": failed,
+        "skipped": fresh_count,
+        "results": results,
+    }
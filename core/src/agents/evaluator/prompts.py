@@ -1,7 +1,16 @@
+import textwrap
+
+from typing import List, Tuple
+
+from src.settings.settings import EvaluatorSettings, GeneralCoreSettings
 from src.agents.evaluator.schemas import JobInfo, CandidateInfo
+from src.utils.text_compactor import normalize_prompt
 
 
 class EvaluatorPrompt:
+
+    # Part of every score fingerprint, bump it when the evaluation prompts change
+    VERSION: str = "1"
     
     @staticmethod
     def candidate_preparation(candidate_info: CandidateInfo):
@@ -20,29 +29,89 @@ class EvaluatorPrompt:
             
         return candidate_info_txt
     
+    @staticmethod
+    def job_preparation(job_info: JobInfo):
+        return (
+            f"- title: {normalize_prompt(job_info.title)}\n"
+            f"- job_type: {normalize_prompt(job_info.job_type)}\n"
+            f"- qualifications: {normalize_prompt(job_info.qualifications)}\n"
+            f"- responsibilities: {normalize_prompt(job_info.responsibilities)}\n"
+            f"- benefits: {normalize_prompt(job_info.benefits)}\n"
+            f"- work_schedule: {normalize_prompt(job_info.work_schedule)}\n"
+            f"- location: {normalize_prompt(job_info.location)}"
+        )
+
+    # The instructions and the job form one byte-stable message shared by every
+    # candidate of the job, the candidate comes last so the provider can cache the prefix
     @classmethod
-    def evaluate_candidate_prompt(cls, job_info: JobInfo, candidate_info: CandidateInfo):
-        return f"""
-            You are an exceptionally strict and highly critical expert in the field of recruitment. 
-            Given the following information about the "Job Position" and the "Candidate," 
-            evaluate the candidate’s suitability for the role on a scale from 0 to 100. 
-            Additionally, provide a detailed explanation for your decision.Keep in mind that 
+    def evaluation_instructions_prompt(cls, job_section: str):
+        return normalize_prompt(textwrap.dedent("""
+            You are an exceptionally strict and highly critical expert in the field of recruitment.
+            Given the following information about the "Job Position" and the "Candidate,"
+            evaluate the candidate’s suitability for the role on a scale from 0 to 100.
+            Additionally, provide a detailed explanation for your decision.Keep in mind that
             I expect an extremely rigorous and demanding assessment. Do not be lenient in your evaluation.
-            
-            Job position:
-            - title: {job_info.title}
-            - job_type: {job_info.job_type}
-            - qualifications: {job_info.qualifications}
-            - responsibilities: {job_info.responsibilities}
-            - benefits: {job_info.benefits}
-            - work_schedule: {job_info.work_schedule}
-            - location: {job_info.location}
-            
-            Candidate information:
-            {cls.candidate_preparation(candidate_info)}
-            
             Return only the extracted result with 2 keys: "score" and "summary_reason" without any additional explanation or commentary
             and return the data as a raw JSON object without formatting it as a code block or using triple backticks.
-        """
-    
-    
\ No newline at end of file
+
+            Job position:
+        """)) + "\n" + job_section
+
+    @classmethod
+    def candidate_prompt(cls, candidate_info: CandidateInfo):
+        return normalize_prompt(f"Candidate information:\n{cls.candidate_preparation(candidate_info)}")
+
+    @classmethod
+    def evaluation_pack_instructions_prompt(cls, job_section: str):
+        return normalize_prompt(textwrap.dedent(f"""
+            You are an exceptionally strict and highly critical expert in the field of recruitment.
+            Given the following information about the "Job Position" and several "Candidates,"
+            evaluate each candidate’s suitability for the role on a scale from 0 to 100, independently
+            of the other candidates. Additionally, provide a detailed explanation for each decision. Keep in mind that
+            I expect an extremely rigorous and demanding assessment. Do not be lenient in your evaluation.
+            Return one entry in "{EvaluatorSettings.EVALUATIONS}" per candidate with the keys "{EvaluatorSettings.CANDIDATE_ID}",
+            "{GeneralCoreSettings.SCORE}" and "{GeneralCoreSettings.SUMMARY_REASON}", without any additional explanation or commentary.
+
+            Job position:
+        """)) + "\n" + job_section
+
+    @classmethod
+    def candidates_pack_prompt(cls, candidates: List[Tuple[int, CandidateInfo]]):
+        return normalize_prompt("Candidates:\n" + "\n".join(
+            f"Candidate id {candidate_id}:\n{cls.candidate_preparation(candidate_info)}"
+            for candidate_id, candidate_info in candidates
+        ))
+
+    @staticmethod
+    def evaluation_pack_response_format():
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "candidate_evaluations",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        EvaluatorSettings.EVALUATIONS: {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    EvaluatorSettings.CANDIDATE_ID: {"type": "integer"},
+                                    GeneralCoreSettings.SCORE: {"type": "number"},
+                                    GeneralCoreSettings.SUMMARY_REASON: {"type": "string"},
+                                },
+                                "required": [
+                                    EvaluatorSettings.CANDIDATE_ID,
+                                    GeneralCoreSettings.SCORE,
+                                    GeneralCoreSettings.SUMMARY_REASON,
+                                ],
+                                "additionalProperties": False,
+                            },
+                        },
+                    },
+                    "required": [EvaluatorSettings.EVALUATIONS],
+                    "additionalProperties": False,
+                },
+            },
+        }
@@ -1,3 +1,6 @@
+import datetime
+
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -11,9 +14,26 @@ class JobInfo(BaseModel):
     location: str
 
 
+class JobContext(BaseModel):
+    job_id: int
+    updated_date: datetime.datetime
+    job_info: JobInfo
+    job_section: str
+
+
 class CandidateInfo(BaseModel):
     extract_objective: str
     extract_experiences: str
     extract_skills: str
     extract_education: str
     extract_certificate: str
+
+
+class CandidateEvaluationResult(BaseModel):
+    candidate_id: int
+    success: bool
+    skipped: bool = False
+    prescreen_score: Optional[float] = None
+    score: Optional[float] = None
+    summary_reason: Optional[str] = None
+    error: Optional[str] = None
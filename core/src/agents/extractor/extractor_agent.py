@@ -1,15 +1,18 @@
 import datetime
-import os
 import logging
 import json
+import time
 
+from typing import Dict
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from src.utils.minio import minio_agent_recruiment
-from src.settings.settings import GeneralCoreSettings, OpenAISettings
+from src.settings.settings import GeneralCoreSettings, OpenAISettings, ExtractorSettings
 from src.utils.pdf_extractor import PDFExtractor
+from src.utils.text_compactor import compact_cv_text
 from src.agents.extractor.prompts import ExtractorPrompt
+from src.agents.prescreen.prescreen_agent import index_candidate
 from src.utils.openai_client import recruitment_openai
 from src.db.models import Candidate
 
@@ -17,19 +20,6 @@ from src.db.models import Candidate
 logger = logging.getLogger(__name__)
 
 
-def remove_file(file_path: str):
-    if os.path.exists(file_path):
-        os.remove(file_path)
-        logger.info(f"Deleted: {file_path}")
-    else:
-        logger.info("File not found!")
-
-
-def check_folder(folder_path: str):
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
-        
-        
 def save_extract_2_db(candidate_id: int, extract_obj: str | None, extract_exp: str | None, 
             extract_skills: str | None, extract_edu: str | None, extract_cert: str | None, db: Session):
     try:
@@ -47,53 +37,154 @@ def save_extract_2_db(candidate_id: int, extract_obj: str | None, extract_exp: s
         db.flush()
         db.commit()
 
+        index_candidate(candidate.job_id, candidate_id, candidate.extract_skills, candidate.extract_experiences,
+                        candidate.extract_education, candidate.updated_date)
+
         return candidate
     except Exception as e:
         raise Exception("Error occured in save extracted information to DB", e)
     
 
-def extract_candidate_cv(candidate_id: int, db: Session):
-    folder_prefix = f"{candidate_id}/"
-    download_path = f"{GeneralCoreSettings.TMP_CANDIDATE_FOLDER}/{candidate_id}.pdf"
+def get_candidate_cv_directory(candidate_id: int, db: Session):
+    try:
+        return db.query(Candidate.CV_directory).filter(Candidate.id == candidate_id).scalar()
+    except Exception as e:
+        raise Exception("Error occured in get candidate CV directory", e)
+
+
+def parse_extraction(completion: str):
+    # Raises on malformed answers so they are never cached
+    json_extracted_data = json.loads(completion)
+    for key in (GeneralCoreSettings.EXTRACT_OBJECTIVE, GeneralCoreSettings.EXTRACT_EXPERIENCES,
+                GeneralCoreSettings.EXTRACT_SKILLS, GeneralCoreSettings.EXTRACT_EDUCATION,
+                GeneralCoreSettings.EXTRACT_CERTIFICATE):
+        if key not in json_extracted_data:
+            raise ValueError(f"Extraction is missing {key}")
+    return json_extracted_data
+
 
-    check_folder(GeneralCoreSettings.TMP_CANDIDATE_FOLDER)
-    minio_agent_recruiment.download_file(
-        folder_prefix, download_path
+def save_extraction_result(candidate_id: int, json_extracted_data: Dict, db: Session):
+    return save_extract_2_db(
+        candidate_id=candidate_id,
+        extract_obj=json_extracted_data[GeneralCoreSettings.EXTRACT_OBJECTIVE],
+        extract_exp=json_extracted_data[GeneralCoreSettings.EXTRACT_EXPERIENCES],
+        extract_skills=json_extracted_data[GeneralCoreSettings.EXTRACT_SKILLS],
+        extract_edu=json_extracted_data[GeneralCoreSettings.EXTRACT_EDUCATION],
+        extract_cert=json_extracted_data[GeneralCoreSettings.EXTRACT_CERTIFICATE],
+        db=db
     )
+
+
+def copy_duplicate_extraction(candidate_id: int, db: Session):
+    try:
+        cv_sha256 = db.query(Candidate.cv_sha256).filter(Candidate.id == candidate_id).scalar()
+        if not cv_sha256:
+            return None
+
+        source = db.query(Candidate).filter(
+            Candidate.cv_sha256 == cv_sha256,
+            Candidate.id != candidate_id,
+            Candidate.extract_skills.is_not(None),
+        ).order_by(Candidate.updated_date.desc()).first()
+        if not source:
+            return None
+
+        json_extracted_data = {
+            GeneralCoreSettings.EXTRACT_OBJECTIVE: source.extract_objective,
+            GeneralCoreSettings.EXTRACT_EXPERIENCES: source.extract_experiences,
+            GeneralCoreSettings.EXTRACT_SKILLS: source.extract_skills,
+            GeneralCoreSettings.EXTRACT_EDUCATION: source.extract_education,
+            GeneralCoreSettings.EXTRACT_CERTIFICATE: source.extract_certificate,
+        }
+        save_extraction_result(candidate_id, json_extracted_data, db)
+        logger.info(f"Candidate {candidate_id} reuses the extraction of candidate {source.id} (same CV hash)")
+
+        return json_extracted_data
+    except Exception as e:
+        raise Exception("Error occured in copy duplicate extraction", e)
+
+
+def load_candidate_cv_text(candidate_id: int, db: Session):
+    cv_directory = get_candidate_cv_directory(candidate_id, db)
+    if not cv_directory:
+        return JSONResponse(status_code=404, content="Candidate CV not found")
+
+    pdf_bytes = minio_agent_recruiment.get_object_bytes(cv_directory)
     pdf_extractor = PDFExtractor()
-    paragraph, is_two_step = pdf_extractor.extract_from_path(download_path)
+    extraction_result = pdf_extractor.extract_from_stream(pdf_bytes)
+    del pdf_bytes
+    logger.info(
+        f"Candidate {candidate_id} page routes: {extraction_result.page_routes}, "
+        f"peak raster {extraction_result.peak_raster_bytes} bytes, "
+        f"peak RSS {extraction_result.peak_rss_bytes} bytes"
+    )
+
+    compaction = compact_cv_text(extraction_result.page_texts)
+    logger.info(
+        f"Candidate {candidate_id} CV text: {compaction.original_tokens} -> {compaction.compacted_tokens} tokens "
+        f"({compaction.saved_tokens} saved{', truncated to budget' if compaction.truncated else ''})"
+    )
 
-    if is_two_step:
+    return compaction.text, extraction_result.is_two_step
+
+
+def extract_candidate_cv(candidate_id: int, db: Session, extraction_mode: str | None = None):
+    extraction_mode = extraction_mode or ExtractorSettings.EXTRACTION_MODE
+    if extraction_mode not in ExtractorSettings.EXTRACTION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown extraction mode {extraction_mode}")
+
+    duplicate_extraction = copy_duplicate_extraction(candidate_id, db)
+    if duplicate_extraction is not None:
+        return duplicate_extraction
+
+    cv_text = load_candidate_cv_text(candidate_id, db)
+    if isinstance(cv_text, JSONResponse):
+        return cv_text
+    paragraph, is_two_step = cv_text
+
+    llm_started_at = time.perf_counter()
+    if is_two_step and extraction_mode == ExtractorSettings.EXTRACTION_MODE_SINGLE_CALL:
+        extracted_data = recruitment_openai.get_completions(
+            prompts=ExtractorPrompt.cv_text_prompt(paragraph),
+            prefix_prompts=ExtractorPrompt.correction_extraction_instructions(),
+            system_role=OpenAISettings.SYSTEM_ROLE,
+            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_CORRECTION_EXTRACTION,
+            response_format=ExtractorPrompt.extraction_response_format(),
+            usage_key=ExtractorSettings.USAGE_KEY,
+            parse=parse_extraction
+        )
+    elif is_two_step:
         correct_paragraph = recruitment_openai.get_completions(
-            prompts=ExtractorPrompt.paragraph_correction_prompt(paragraph),
+            prompts=ExtractorPrompt.cv_text_prompt(paragraph),
+            prefix_prompts=ExtractorPrompt.paragraph_correction_instructions(),
             system_role=OpenAISettings.SYSTEM_ROLE,
-            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_PARAGRAPH_CORRECTION_PROMPT
+            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_PARAGRAPH_CORRECTION_PROMPT,
+            usage_key=ExtractorSettings.USAGE_KEY
         )
         extracted_data = recruitment_openai.get_completions(
-            prompts=ExtractorPrompt.extraction_prompt(correct_paragraph),
+            prompts=ExtractorPrompt.cv_text_prompt(correct_paragraph),
+            prefix_prompts=ExtractorPrompt.extraction_instructions(),
             system_role=OpenAISettings.SYSTEM_ROLE,
-            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EXTRACTION
+            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EXTRACTION,
+            usage_key=ExtractorSettings.USAGE_KEY,
+            parse=parse_extraction
         )
     else:
         extracted_data = recruitment_openai.get_completions(
-            prompts=ExtractorPrompt.extraction_prompt(paragraph),
+            prompts=ExtractorPrompt.cv_text_prompt(paragraph),
+            prefix_prompts=ExtractorPrompt.extraction_instructions(),
             system_role=OpenAISettings.SYSTEM_ROLE,
-            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EXTRACTION
+            system_content=OpenAISettings.SYSTEM_CONTENT_FOR_EXTRACTION,
+            usage_key=ExtractorSettings.USAGE_KEY,
+            parse=parse_extraction
         )
-        
-    json_extracted_data = json.loads(extracted_data)
-    
-    save_extract_2_db(
-        candidate_id=candidate_id,
-        extract_obj=json_extracted_data[GeneralCoreSettings.EXTRACT_OBJECTIVE],
-        extract_exp=json_extracted_data[GeneralCoreSettings.EXTRACT_EXPERIENCES],
-        extract_skills=json_extracted_data[GeneralCoreSettings.EXTRACT_SKILLS],
-        extract_edu=json_extracted_data[GeneralCoreSettings.EXTRACT_EDUCATION],
-        extract_cert=json_extracted_data[GeneralCoreSettings.EXTRACT_CERTIFICATE],
-        db=db
+    logger.info(
+        f"Candidate {candidate_id} LLM extraction took {time.perf_counter() - llm_started_at:.2f}s "
+        f"(mode={extraction_mode if is_two_step else 'direct'})"
     )
+
+    save_extraction_result(candidate_id, extracted_data, db)
     
-    remove_file(download_path)
-    logger.info(json_extracted_data)
+    logger.info(extracted_data)
 
-    return json_extracted_data
+    return extracted_data
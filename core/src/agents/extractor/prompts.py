@@ -1,33 +1,69 @@
+import textwrap
+
 from src.settings.settings import GeneralCoreSettings
+from src.utils.text_compactor import normalize_prompt
 
 
 class ExtractorPrompt:
 
+    # Static instructions go in their own message ahead of the CV so the
+    # provider can cache the shared prefix across candidates
     @classmethod
-    def paragraph_correction_prompt(cls, paragraph: str):
-        return f"""
-            The following text is written in either English or Vietnamese and may contain 
-            spelling or grammatical errors. Please restore and correct any mistakes, returning only the fully corrected text. 
-            Do not provide any additional information:
-            ```
-            {paragraph}
-            ```
-        """
+    def paragraph_correction_instructions(cls):
+        return normalize_prompt(textwrap.dedent("""
+            The following text is written in either English or Vietnamese and may contain
+            spelling or grammatical errors. Please restore and correct any mistakes, returning only the fully corrected text.
+            Do not provide any additional information.
+        """))
 
     @classmethod
-    def extraction_prompt(cls, paragraph: str):
-        return f"""
-            Given the following text, which is a CV/resume of a candidate (in either Vietnamese or English), 
-            extract the information into a dictionary with the following five fields: "{GeneralCoreSettings.EXTRACT_OBJECTIVE}", 
-            "{GeneralCoreSettings.EXTRACT_EXPERIENCES}", "{GeneralCoreSettings.EXTRACT_SKILLS}", 
+    def extraction_instructions(cls):
+        return normalize_prompt(textwrap.dedent(f"""
+            Given the following text, which is a CV/resume of a candidate (in either Vietnamese or English),
+            extract the information into a dictionary with the following five fields: "{GeneralCoreSettings.EXTRACT_OBJECTIVE}",
+            "{GeneralCoreSettings.EXTRACT_EXPERIENCES}", "{GeneralCoreSettings.EXTRACT_SKILLS}",
             "{GeneralCoreSettings.EXTRACT_EDUCATION}", and "{GeneralCoreSettings.EXTRACT_CERTIFICATE}".
             Each extracted value should be formatted as a well-structured string for readability.
             If a field has no relevant information, return 0.
             Return only the extracted result without any additional explanation or commentary
             and return the data as a raw JSON object without formatting it as a code block or using triple backticks.
-            
-            Here is the text:
-            ```
-            {paragraph}
-            ```
-        """
+        """))
+
+    @classmethod
+    def correction_extraction_instructions(cls):
+        return normalize_prompt(textwrap.dedent(f"""
+            Given the following text, which is a CV/resume of a candidate (in either Vietnamese or English)
+            recovered by OCR, first mentally restore any spelling, grammatical or OCR recognition mistakes,
+            then extract the corrected information into the following five fields: "{GeneralCoreSettings.EXTRACT_OBJECTIVE}",
+            "{GeneralCoreSettings.EXTRACT_EXPERIENCES}", "{GeneralCoreSettings.EXTRACT_SKILLS}",
+            "{GeneralCoreSettings.EXTRACT_EDUCATION}", and "{GeneralCoreSettings.EXTRACT_CERTIFICATE}".
+            Each extracted value should be formatted as a well-structured string for readability.
+            If a field has no relevant information, return "0".
+        """))
+
+    @classmethod
+    def cv_text_prompt(cls, paragraph: str):
+        return f"Here is the text:\n```\n{normalize_prompt(paragraph)}\n```"
+
+    @staticmethod
+    def extraction_response_format():
+        fields = [
+            GeneralCoreSettings.EXTRACT_OBJECTIVE,
+            GeneralCoreSettings.EXTRACT_EXPERIENCES,
+            GeneralCoreSettings.EXTRACT_SKILLS,
+            GeneralCoreSettings.EXTRACT_EDUCATION,
+            GeneralCoreSettings.EXTRACT_CERTIFICATE,
+        ]
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "cv_extraction",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": {field: {"type": "string"} for field in fields},
+                    "required": fields,
+                    "additionalProperties": False,
+                },
+            },
+        }
@@ -0,0 +1,88 @@
+import math
+import re
+import threading
+
+from collections import Counter
+from typing import Dict, Iterable, List
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 or token.isdigit()]
+
+
+class BM25Index:
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_versions: Dict[int, object] = {}
+        self._doc_freq: Counter = Counter()
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def doc_ids(self):
+        with self._lock:
+            return set(self._doc_terms)
+
+    def version(self, doc_id: int):
+        return self._doc_versions.get(doc_id)
+
+    def upsert(self, doc_id: int, text: str, version=None):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            self._doc_terms[doc_id] = terms
+            self._doc_versions[doc_id] = version
+            self._doc_freq.update(terms.keys())
+            self._total_length += sum(terms.values())
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        self._doc_versions.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            self._doc_freq[term] -= 1
+            if self._doc_freq[term] <= 0:
+                del self._doc_freq[term]
+        self._total_length -= sum(terms.values())
+
+    def score(self, query: str, doc_ids: Iterable[int]):
+        query_terms = Counter(tokenize(query))
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if not doc_count:
+                return {doc_id: 0.0 for doc_id in doc_ids}
+            average_length = self._total_length / doc_count
+            idf = {
+                term: math.log(1 + (doc_count - self._doc_freq[term] + 0.5) / (self._doc_freq[term] + 0.5))
+                for term in query_terms
+            }
+
+            scores = {}
+            for doc_id in doc_ids:
+                terms = self._doc_terms.get(doc_id)
+                if terms is None:
+                    scores[doc_id] = 0.0
+                    continue
+                length_norm = self.k1 * (1 - self.b + self.b * sum(terms.values()) / (average_length or 1))
+                scores[doc_id] = sum(
+                    idf[term] * query_count * terms[term] * (self.k1 + 1) / (terms[term] + length_norm)
+                    for term, query_count in query_terms.items()
+                    if terms[term]
+                ) + 0.0
+            return scores
+
+    def rank(self, query: str, doc_ids: Iterable[int]) -> List[tuple]:
+        scores = self.score(query, doc_ids)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+
+from typing import Dict, List
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from src.agents.prescreen.bm25_index import BM25Index
+from src.db.models import Candidate, Job
+
+
+logger = logging.getLogger(__name__)
+
+# One index per job over all of its applicants, so IDF and average length (and therefore
+# the meaning of min_score) depend only on the job's applicants, not on process history
+job_indexes: Dict[int, BM25Index] = {}
+job_indexes_lock = threading.Lock()
+
+
+def get_job_index(job_id: int):
+    with job_indexes_lock:
+        if job_id not in job_indexes:
+            job_indexes[job_id] = BM25Index()
+        return job_indexes[job_id]
+
+
+def candidate_document(extract_skills: str | None, extract_experiences: str | None,
+                       extract_education: str | None):
+    return "\n".join(text for text in (extract_skills, extract_experiences, extract_education) if text)
+
+
+def job_document(job: Job):
+    return "\n".join([job.title, job.qualifications, job.responsibilities])
+
+
+def index_candidate(job_id: int, candidate_id: int, extract_skills: str | None,
+                    extract_experiences: str | None, extract_education: str | None, updated_date=None):
+    # Jobs that were never ranked here are indexed in full by their first sync
+    with job_indexes_lock:
+        job_index = job_indexes.get(job_id)
+    if job_index is not None:
+        job_index.upsert(
+            candidate_id,
+            candidate_document(extract_skills, extract_experiences, extract_education),
+            version=updated_date
+        )
+
+
+def sync_job_index(job_id: int, db: Session):
+    # Other processes may have extracted or added applicants, refresh what changed since
+    try:
+        job_index = get_job_index(job_id)
+        versions = dict(db.query(Candidate.id, Candidate.updated_date).filter(Candidate.job_id == job_id).all())
+        for candidate_id in job_index.doc_ids() - versions.keys():
+            job_index.remove(candidate_id)
+
+        stale_ids = [
+            candidate_id for candidate_id, updated_date in versions.items()
+            if job_index.version(candidate_id) is None or job_index.version(candidate_id) != updated_date
+        ]
+        if not stale_ids:
+            return 0
+
+        rows = db.query(
+            Candidate.id,
+            Candidate.extract_skills,
+            Candidate.extract_experiences,
+            Candidate.extract_education,
+            Candidate.updated_date,
+        ).filter(Candidate.id.in_(stale_ids)).all()
+        for row in rows:
+            index_candidate(job_id, row.id, row.extract_skills, row.extract_experiences,
+                            row.extract_education, row.updated_date)
+        return len(rows)
+    except Exception as e:
+        raise Exception("Error occured in sync job index", e)
+
+
+def rank_candidates(job_id: int, db: Session, candidate_ids: List[int] | None = None):
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        return JSONResponse(status_code=404, content="Job not found")
+
+    if candidate_ids is None:
+        candidate_ids = [candidate_id for candidate_id, in db.query(Candidate.id).filter(Candidate.job_id == job_id).all()]
+
+    started_at = time.perf_counter()
+    refreshed = sync_job_index(job_id, db)
+    ranking = get_job_index(job_id).rank(job_document(job), candidate_ids)
+    logger.info(
+        f"Ranked {len(ranking)} candidates for job {job_id} in {(time.perf_counter() - started_at) * 1000:.1f}ms "
+        f"({refreshed} re-indexed)"
+    )
+    return ranking
+
+
+def prescreen_candidates(job_id: int, candidate_ids: List[int] | None, db: Session,
+                         top_n: int | None = None, min_score: float | None = None):
+    ranking = rank_candidates(job_id, db, candidate_ids)
+    if isinstance(ranking, JSONResponse):
+        return ranking
+
+    shortlist = [(candidate_id, score) for candidate_id, score in ranking
+                 if min_score is None or score >= min_score]
+    if top_n is not None:
+        shortlist = shortlist[:top_n]
+
+    return {
+        "shortlisted": [candidate_id for candidate_id, _ in shortlist],
+        "scores": dict(ranking),
+    }
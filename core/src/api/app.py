@@ -1,22 +1,35 @@
 from contextlib import asynccontextmanager
 import logging
+import time
 
-from fastapi import FastAPI, Depends, HTTPException, status, Body, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status, Body
 from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.routing import APIRouter
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
-from src.settings.settings import GeneralCoreSettings, display_startup_message
-from src.agents.extractor.extractor_agent import extract_candidate_cv
-from src.agents.evaluator.evaluator_agent import evaluate_candidates
-from src.db.session import get_db
+from src.settings.settings import (
+    GeneralCoreSettings, TaskQueueSettings, ExtractorSettings,
+    EvaluatorSettings, MetricsSettings, PrescreenSettings, ProfilingSettings,
+    QueryInstrumentationSettings, display_startup_message
+)
+from src.agents.prescreen.prescreen_agent import prescreen_candidates
+from src.tasks.task_queue import enqueue_task, enqueue_tasks, get_task, get_queue_stats
+from src.db.query_counter import check_query_budget, query_scope
+from src.db.schema import upgrade_schema
+from src.db.session import Base, engine, get_db
+from src.utils.metrics import HTTP_REQUEST_SECONDS, TASK_QUEUE_DEPTH, render_metrics
+from src.utils.profiler import (
+    ProfiledRoute, profile_endpoint_thread, profile_requested, profiling_toggle, should_profile
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     display_startup_message()
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
     yield
 
 app = FastAPI(lifespan=lifespan, title=GeneralCoreSettings.APP_TITLE)
@@ -41,7 +54,64 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security_sc
     return token
 
 
-router = APIRouter(prefix=GeneralCoreSettings.PREFIX)
+router = APIRouter(prefix=GeneralCoreSettings.PREFIX, route_class=ProfiledRoute)
+
+
+if MetricsSettings.ENABLED:
+
+    @app.middleware("http")
+    async def observe_http_latency(request: Request, call_next):
+        started_at = time.perf_counter()
+        response = await call_next(request)
+        # The route template keeps label cardinality bounded, e.g. /tasks/{task_id}
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=response.status_code
+        ).observe(time.perf_counter() - started_at)
+        return response
+
+    @app.get(MetricsSettings.ENDPOINT, include_in_schema=False)
+    def metrics(db: Session = Depends(get_db)):
+        try:
+            queue_stats = get_queue_stats(db)
+            for task_status in (TaskQueueSettings.STATUS_PENDING, TaskQueueSettings.STATUS_RUNNING,
+                                TaskQueueSettings.STATUS_SUCCEEDED, TaskQueueSettings.STATUS_FAILED):
+                TASK_QUEUE_DEPTH.labels(status=task_status).set(queue_stats.get(task_status, 0))
+        except Exception as e:
+            logger.error(f"Could not refresh the task queue depth: {e}")
+        content, content_type = render_metrics()
+        return Response(content=content, media_type=content_type)
+
+
+@app.middleware("http")
+async def query_instrumentation(request: Request, call_next):
+    with query_scope(f"{request.method} {request.url.path}") as query_stats:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            query_stats["name"] = f"{request.method} {route.path}"
+    if route is not None:
+        check_query_budget(query_stats["name"], query_stats, QueryInstrumentationSettings.BUDGETS.get(
+            route.path, QueryInstrumentationSettings.DEFAULT_BUDGET
+        ))
+    return response
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if not should_profile(request.headers.get(ProfilingSettings.HEADER)):
+        return await call_next(request)
+
+    # Endpoints are sync, only the threadpool thread running this request's endpoint is sampled
+    with profile_endpoint_thread(f"{request.method} {request.url.path}") as report:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        report["route"] = route.path if route is not None else None
+        report["status"] = response.status_code
+    response.headers["X-Profile-Id"] = report["profile_id"]
+    return response
 
 
 @router.get("/health/")
@@ -51,25 +121,154 @@ def health_check():
 
 @router.post("/extract_candidate_cv/")
 def extract_candidate_cv_api(
-    background_tasks: BackgroundTasks,
+    request: Request,
     candidate_id: int = Body(..., embed=True),
+    extraction_mode: Optional[str] = Body(None, embed=True),
+    token: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    if extraction_mode is not None and extraction_mode not in ExtractorSettings.EXTRACTION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown extraction mode {extraction_mode}")
+
+    task = enqueue_task(
+        TaskQueueSettings.TASK_EXTRACT_CANDIDATE_CV,
+        {
+            "candidate_id": candidate_id,
+            "extraction_mode": extraction_mode,
+            ProfilingSettings.PAYLOAD_KEY: profile_requested(request.headers.get(ProfilingSettings.HEADER)),
+        },
+        db
+    )
+    return {"message": f"Candidate id {candidate_id} is queued for extraction", "task_id": task.id}
+
+
+@router.post("/extract_candidates_cv/")
+def extract_candidates_cv_api(
+    request: Request,
+    candidate_ids: List[int] = Body(..., embed=True),
+    dedupe_keys: Optional[List[str]] = Body(None, embed=True),
+    extraction_mode: Optional[str] = Body(None, embed=True),
     token: str = Depends(verify_token),
     db: Session = Depends(get_db)
 ):
-    background_tasks.add_task(extract_candidate_cv, candidate_id, db)
-    return {"message": f"Candidate id {candidate_id} is extracted"}
+    if extraction_mode is not None and extraction_mode not in ExtractorSettings.EXTRACTION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown extraction mode {extraction_mode}")
+    if dedupe_keys is not None and len(dedupe_keys) != len(candidate_ids):
+        return JSONResponse(status_code=400, content="dedupe_keys must match candidate_ids one to one")
+    if not candidate_ids:
+        return {"task_ids": [], "duplicates": 0}
+
+    profile_flag = profile_requested(request.headers.get(ProfilingSettings.HEADER))
+    task_ids = enqueue_tasks(
+        TaskQueueSettings.TASK_EXTRACT_CANDIDATE_CV,
+        [
+            {"candidate_id": candidate_id, "extraction_mode": extraction_mode, ProfilingSettings.PAYLOAD_KEY: profile_flag}
+            for candidate_id in candidate_ids
+        ],
+        dedupe_keys or [None] * len(candidate_ids),
+        db
+    )
+    return {"task_ids": task_ids, "duplicates": len(candidate_ids) - len(task_ids)}
 
 
 @router.post("/evaluate_candidate")
 def evaluate(
-    background_tasks: BackgroundTasks,
+    request: Request,
     candidate_ids: List[int] = Body(..., embed=True),
     job_id: int = Body(..., embed=True),
+    evaluation_mode: Optional[str] = Body(None, embed=True),
+    prescreen_top_n: Optional[int] = Body(None, embed=True),
+    prescreen_min_score: Optional[float] = Body(None, embed=True),
+    token: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    if evaluation_mode is not None and evaluation_mode not in EvaluatorSettings.EVALUATION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown evaluation mode {evaluation_mode}")
+
+    task = enqueue_task(
+        TaskQueueSettings.TASK_EVALUATE_CANDIDATES,
+        {
+            "candidate_ids": candidate_ids,
+            "job_id": job_id,
+            "evaluation_mode": evaluation_mode,
+            "prescreen_top_n": prescreen_top_n if prescreen_top_n is not None else PrescreenSettings.DEFAULT_TOP_N,
+            "prescreen_min_score": prescreen_min_score if prescreen_min_score is not None
+            else PrescreenSettings.DEFAULT_MIN_SCORE,
+            ProfilingSettings.PAYLOAD_KEY: profile_requested(request.headers.get(ProfilingSettings.HEADER)),
+        },
+        db
+    )
+    return {"message": f"Candidate \"{candidate_ids}\" are queued for evaluation", "task_id": task.id}
+
+
+@router.post("/refresh_job_scores")
+def refresh_scores(
+    request: Request,
+    job_id: int = Body(..., embed=True),
+    evaluation_mode: Optional[str] = Body(None, embed=True),
+    token: str = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    if evaluation_mode is not None and evaluation_mode not in EvaluatorSettings.EVALUATION_MODES:
+        return JSONResponse(status_code=400, content=f"Unknown evaluation mode {evaluation_mode}")
+
+    task = enqueue_task(
+        TaskQueueSettings.TASK_REFRESH_JOB_SCORES,
+        {
+            "job_id": job_id,
+            "evaluation_mode": evaluation_mode,
+            ProfilingSettings.PAYLOAD_KEY: profile_requested(request.headers.get(ProfilingSettings.HEADER)),
+        },
+        db
+    )
+    return {"message": f"Stale scores of job {job_id} are queued for refresh", "task_id": task.id}
+
+
+@router.post("/prescreen_candidates")
+def prescreen(
+    job_id: int = Body(..., embed=True),
+    candidate_ids: Optional[List[int]] = Body(None, embed=True),
+    top_n: Optional[int] = Body(None, embed=True),
+    min_score: Optional[float] = Body(None, embed=True),
     token: str = Depends(verify_token),
     db: Session = Depends(get_db)
 ):
-    background_tasks.add_task(evaluate_candidates, candidate_ids, job_id, db)
-    return {"message": f"Candidate \"{candidate_ids}\" are evaluated"}
+    return prescreen_candidates(job_id, candidate_ids, db, top_n, min_score)
+
+
+@router.get("/profiling/status")
+def profiling_status(token: str = Depends(verify_token)):
+    return profiling_toggle.get()
+
+
+@router.post("/profiling/toggle")
+def profiling_toggle_api(
+    enabled: bool = Body(..., embed=True),
+    sample_rate: float = Body(ProfilingSettings.SAMPLE_RATE, embed=True),
+    token: str = Depends(verify_token)
+):
+    return profiling_toggle.set(enabled, sample_rate)
+
+
+@router.get("/tasks/stats")
+def task_stats(token: str = Depends(verify_token), db: Session = Depends(get_db)):
+    return get_queue_stats(db)
+
+
+@router.get("/tasks/{task_id}")
+def task_status(task_id: int, token: str = Depends(verify_token), db: Session = Depends(get_db)):
+    task = get_task(task_id, db)
+    if not task:
+        return JSONResponse(status_code=404, content="Task not found")
+    return {
+        "task_id": task.id,
+        "task_type": task.task_type,
+        "status": task.status,
+        "attempts": task.attempts,
+        "max_attempts": task.max_attempts,
+        "last_error": task.last_error,
+        "result": task.result,
+    }
 
 
 app.include_router(router)
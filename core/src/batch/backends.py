@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import shutil
+import uuid
+
+from abc import ABC, abstractmethod
+from typing import Callable, Dict
+
+from src.settings.settings import BatchSettings
+from src.utils.stand_in_llm import stand_in_completion
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBackend(ABC):
+
+    @abstractmethod
+    def submit(self, input_path: str) -> str:
+        pass
+
+    @abstractmethod
+    def poll(self, batch_id: str) -> str:
+        pass
+
+    @abstractmethod
+    def download_results(self, batch_id: str, output_path: str):
+        pass
+
+
+class OpenAIBatchBackend(BatchBackend):
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, input_path: str):
+        with open(input_path, "rb") as input_file:
+            batch_file = self.client.files.create(file=input_file, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=BatchSettings.ENDPOINT,
+            completion_window=BatchSettings.COMPLETION_WINDOW,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str):
+        return self.client.batches.retrieve(batch_id).status
+
+    def download_results(self, batch_id: str, output_path: str):
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, "w", encoding="utf-8") as output_file:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    output_file.write(self.client.files.content(file_id).text)
+
+
+class LocalFileBatchBackend(BatchBackend):
+    # Answers a batch file on disk with the stand-in LLM, so the flow runs without network access
+
+    def __init__(self, work_dir: str = BatchSettings.WORK_DIR,
+                 responder: Callable[[Dict], str] = stand_in_completion):
+        self.work_dir = work_dir
+        self.responder = responder
+
+    def _batch_dir(self, batch_id: str):
+        return os.path.join(self.work_dir, batch_id)
+
+    def submit(self, input_path: str):
+        batch_id = f"local_batch_{uuid.uuid4().hex}"
+        os.makedirs(self._batch_dir(batch_id), exist_ok=True)
+        shutil.copyfile(input_path, os.path.join(self._batch_dir(batch_id), "input.jsonl"))
+        return batch_id
+
+    def poll(self, batch_id: str):
+        output_path = os.path.join(self._batch_dir(batch_id), "output.jsonl")
+        if not os.path.exists(output_path):
+            self._process(batch_id, output_path)
+        return BatchSettings.STATUS_COMPLETED
+
+    def _process(self, batch_id: str, output_path: str):
+        input_path = os.path.join(self._batch_dir(batch_id), "input.jsonl")
+        with open(input_path, encoding="utf-8") as input_file, \
+                open(f"{output_path}.part", "w", encoding="utf-8") as output_file:
+            for line in input_file:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                try:
+                    content = self.responder(request["body"])
+                    result = {
+                        "id": f"{batch_id}_{request['custom_id']}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+                        },
+                        "error": None,
+                    }
+                except Exception as e:
+                    result = {
+                        "id": f"{batch_id}_{request['custom_id']}",
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"message": str(e)},
+                    }
+                output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        os.replace(f"{output_path}.part", output_path)
+        logger.info(f"Local batch {batch_id} processed")
+
+    def download_results(self, batch_id: str, output_path: str):
+        shutil.copyfile(os.path.join(self._batch_dir(batch_id), "output.jsonl"), output_path)
+
+
+def get_batch_backend(name: str = BatchSettings.BACKEND):
+    if name == BatchSettings.BACKEND_LOCAL:
+        return LocalFileBatchBackend()
+    if name == BatchSettings.BACKEND_OPENAI:
+        from src.utils.openai_client import recruitment_openai
+        return OpenAIBatchBackend(recruitment_openai.client)
+    raise ValueError(f"Unknown batch backend {name}")
@@ -0,0 +1,215 @@
+import argparse
+import json
+import logging
+import os
+import time
+
+from typing import Dict, List
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from src.settings.settings import BatchSettings, EvaluatorSettings, GeneralCoreSettings, OpenAISettings
+from src.agents.evaluator.evaluator_agent import (
+    get_candidates_info, get_job_context, save_eval_2_db, score_fingerprint
+)
+from src.agents.evaluator.prompts import EvaluatorPrompt
+from src.agents.evaluator.schemas import CandidateInfo, JobContext
+from src.agents.extractor.extractor_agent import (
+    copy_duplicate_extraction, load_candidate_cv_text, save_extraction_result
+)
+from src.agents.extractor.prompts import ExtractorPrompt
+from src.batch.backends import BatchBackend, get_batch_backend
+from src.db.models import Candidate
+from src.db.session import SessionLocal
+from src.utils.openai_client import RecruitmentOpenAI
+
+
+logger = logging.getLogger(__name__)
+
+
+def batch_request(custom_id: str, prompts: str, prefix_prompts: str, system_content: str,
+                  response_format: Dict | None = None):
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BatchSettings.ENDPOINT,
+        "body": RecruitmentOpenAI.build_request_body(
+            prompts, OpenAISettings.SYSTEM_ROLE, system_content, response_format, prefix_prompts
+        ),
+    }
+
+
+def build_extraction_requests(candidate_ids: List[int], db: Session):
+    requests = []
+    for candidate_id in candidate_ids:
+        try:
+            if copy_duplicate_extraction(candidate_id, db) is not None:
+                continue
+            cv_text = load_candidate_cv_text(candidate_id, db)
+            if isinstance(cv_text, JSONResponse):
+                logger.warning(f"Skipping candidate {candidate_id}: {cv_text.body.decode()}")
+                continue
+            paragraph, is_two_step = cv_text
+        except Exception as e:
+            logger.error(f"Skipping candidate {candidate_id}: {e}")
+            continue
+
+        # A batch cannot chain calls, so OCR'd CVs use the single-call correction and extraction
+        if is_two_step:
+            requests.append(batch_request(
+                f"{BatchSettings.KIND_EXTRACT}:{candidate_id}",
+                ExtractorPrompt.cv_text_prompt(paragraph),
+                ExtractorPrompt.correction_extraction_instructions(),
+                OpenAISettings.SYSTEM_CONTENT_FOR_CORRECTION_EXTRACTION,
+                ExtractorPrompt.extraction_response_format(),
+            ))
+        else:
+            requests.append(batch_request(
+                f"{BatchSettings.KIND_EXTRACT}:{candidate_id}",
+                ExtractorPrompt.cv_text_prompt(paragraph),
+                ExtractorPrompt.extraction_instructions(),
+                OpenAISettings.SYSTEM_CONTENT_FOR_EXTRACTION,
+            ))
+    return requests
+
+
+def build_evaluation_requests(candidate_ids: List[int], job_id: int, db: Session):
+    job_context = get_job_context(job_id, db)
+    if not isinstance(job_context, JobContext):
+        raise Exception(f"Job {job_id} not found")
+
+    requests = []
+    for candidate_id, candidate_row in get_candidates_info(candidate_ids, db).items():
+        try:
+            candidate_info = CandidateInfo(**candidate_row)
+        except Exception as e:
+            logger.warning(f"Skipping candidate {candidate_id}, not extracted yet: {e}")
+            continue
+        requests.append(batch_request(
+            f"{BatchSettings.KIND_EVALUATE}:{job_id}:{candidate_id}:"
+            f"{score_fingerprint(job_context, candidate_info, EvaluatorSettings.EVALUATION_MODE_SINGLE)}",
+            EvaluatorPrompt.candidate_prompt(candidate_info),
+            EvaluatorPrompt.evaluation_instructions_prompt(job_context.job_section),
+            OpenAISettings.SYSTEM_CONTENT_FOR_EVALUATION,
+        ))
+    return requests
+
+
+def write_batch_file(requests: List[Dict], input_path: str):
+    os.makedirs(os.path.dirname(input_path) or ".", exist_ok=True)
+    with open(input_path, "w", encoding="utf-8") as input_file:
+        for request in requests:
+            input_file.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+def apply_batch_results(output_path: str, db: Session):
+    report = {"applied": 0, "failed": 0, "errors": {}}
+    with open(output_path, encoding="utf-8") as output_file:
+        for line in output_file:
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result["custom_id"]
+            try:
+                response = result.get("response")
+                if result.get("error") or not response or response["status_code"] != 200:
+                    raise Exception(result.get("error") or response)
+                content = json.loads(response["body"]["choices"][0]["message"]["content"])
+
+                kind, *ids = custom_id.split(":")
+                if kind == BatchSettings.KIND_EXTRACT:
+                    save_extraction_result(int(ids[0]), content, db)
+                elif kind == BatchSettings.KIND_EVALUATE:
+                    save_eval_2_db(
+                        candidate_id=int(ids[1]),
+                        score=content[GeneralCoreSettings.SCORE],
+                        summary_reason=content[GeneralCoreSettings.SUMMARY_REASON],
+                        db=db,
+                        fingerprint=ids[2] if len(ids) > 2 else None
+                    )
+                else:
+                    raise Exception(f"Unknown batch request kind {kind}")
+                report["applied"] += 1
+            except Exception as e:
+                db.rollback()
+                report["failed"] += 1
+                report["errors"][custom_id] = str(e)
+    return report
+
+
+def run_batch(requests: List[Dict], backend: BatchBackend, db: Session,
+              work_dir: str = BatchSettings.WORK_DIR,
+              poll_interval: float = BatchSettings.POLL_INTERVAL_SECONDS):
+    if not requests:
+        return {"batch_id": None, "status": "empty", "applied": 0, "failed": 0, "errors": {}}
+
+    run_name = f"batch_{int(time.time())}"
+    input_path = os.path.join(work_dir, f"{run_name}_input.jsonl")
+    write_batch_file(requests, input_path)
+
+    batch_id = backend.submit(input_path)
+    logger.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+
+    status = backend.poll(batch_id)
+    while status not in BatchSettings.TERMINAL_STATUSES:
+        time.sleep(poll_interval)
+        status = backend.poll(batch_id)
+    logger.info(f"Batch {batch_id} finished with status {status}")
+
+    if status != BatchSettings.STATUS_COMPLETED:
+        return {"batch_id": batch_id, "status": status, "applied": 0, "failed": len(requests), "errors": {}}
+
+    output_path = os.path.join(work_dir, f"{run_name}_output.jsonl")
+    backend.download_results(batch_id, output_path)
+    report = apply_batch_results(output_path, db)
+    report.update({"batch_id": batch_id, "status": status})
+    return report
+
+
+def select_candidate_ids(kind: str, job_id: int | None, db: Session):
+    query = db.query(Candidate.id)
+    if job_id is not None:
+        query = query.filter(Candidate.job_id == job_id)
+    if kind == BatchSettings.KIND_EXTRACT:
+        query = query.filter(Candidate.CV_directory.is_not(None), Candidate.extract_skills.is_(None))
+    else:
+        query = query.filter(Candidate.extract_skills.is_not(None))
+    return [candidate_id for candidate_id, in query.order_by(Candidate.id).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run offline batch extraction or evaluation")
+    parser.add_argument("--kind", choices=[BatchSettings.KIND_EXTRACT, BatchSettings.KIND_EVALUATE], required=True)
+    parser.add_argument("--job-id", type=int)
+    parser.add_argument("--candidate-ids", type=int, nargs="*")
+    parser.add_argument("--backend", choices=[BatchSettings.BACKEND_OPENAI, BatchSettings.BACKEND_LOCAL],
+                        default=BatchSettings.BACKEND)
+    parser.add_argument("--poll-interval", type=float, default=BatchSettings.POLL_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    if args.kind == BatchSettings.KIND_EVALUATE and args.job_id is None:
+        parser.error("--job-id is required for evaluation batches")
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    db = SessionLocal()
+    try:
+        candidate_ids = args.candidate_ids or select_candidate_ids(args.kind, args.job_id, db)
+        if args.kind == BatchSettings.KIND_EXTRACT:
+            requests = build_extraction_requests(candidate_ids, db)
+        else:
+            requests = build_evaluation_requests(candidate_ids, args.job_id, db)
+
+        report = run_batch(requests, get_batch_backend(args.backend), db, poll_interval=args.poll_interval)
+        logger.info(
+            f"Batch {report['batch_id']} ({report['status']}): "
+            f"{report['applied']} applied, {report['failed']} failed"
+        )
+        for custom_id, error in report["errors"].items():
+            logger.error(f"{custom_id}: {error}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.settings.settings import BenchmarkSettings
+from src.utils.stand_in_llm import stand_in_completion
+from src.utils.text_compactor import count_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+class FakeLLMBehaviour:
+    """Latency and error injection shared by every request thread, seeded for repeatable runs."""
+
+    def __init__(self, latency_median_ms: float, latency_sigma: float, error_rate: float,
+                 throttle_share: float, seed: int):
+        self.latency_median_ms = latency_median_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_share = throttle_share
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def next_outcome(self):
+        with self.lock:
+            latency_seconds = self.random.lognormvariate(math.log(self.latency_median_ms), self.latency_sigma) / 1000
+            if self.random.random() >= self.error_rate:
+                return latency_seconds, None
+            return latency_seconds, 429 if self.random.random() < self.throttle_share else 500
+
+
+def completion_response(request_body, content: str):
+    prompt_tokens = sum(count_tokens(message["content"]) for message in request_body["messages"])
+    completion_tokens = count_tokens(content)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request_body.get("model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        },
+    }
+
+
+def make_handler(behaviour: FakeLLMBehaviour):
+
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+
+        def send_json(self, status: int, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                self.send_json(200, {"status": "ok"})
+            else:
+                self.send_json(404, {"error": {"message": "Not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_json(404, {"error": {"message": "Not found"}})
+                return
+
+            request_body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            latency_seconds, error_status = behaviour.next_outcome()
+            time.sleep(latency_seconds)
+
+            if error_status == 429:
+                self.send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                               {"retry-after": str(BenchmarkSettings.FAKE_LLM_RETRY_AFTER_SECONDS)})
+            elif error_status is not None:
+                self.send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            else:
+                self.send_json(200, completion_response(request_body, stand_in_completion(request_body)))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return FakeLLMHandler
+
+
+def serve(host: str = BenchmarkSettings.FAKE_LLM_HOST, port: int = BenchmarkSettings.FAKE_LLM_PORT,
+          behaviour: FakeLLMBehaviour | None = None):
+    behaviour = behaviour or FakeLLMBehaviour(
+        BenchmarkSettings.FAKE_LLM_LATENCY_MEDIAN_MS,
+        BenchmarkSettings.FAKE_LLM_LATENCY_SIGMA,
+        BenchmarkSettings.FAKE_LLM_ERROR_RATE,
+        BenchmarkSettings.FAKE_LLM_THROTTLE_SHARE,
+        BenchmarkSettings.FAKE_LLM_SEED,
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(behaviour))
+    server.daemon_threads = True
+    logger.info(
+        f"Fake LLM listening on {host}:{port} (median {behaviour.latency_median_ms}ms, "
+        f"sigma {behaviour.latency_sigma}, error rate {behaviour.error_rate})"
+    )
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a deterministic OpenAI-compatible stub server")
+    parser.add_argument("--host", default=BenchmarkSettings.FAKE_LLM_HOST)
+    parser.add_argument("--port", type=int, default=BenchmarkSettings.FAKE_LLM_PORT)
+    parser.add_argument("--latency-median-ms", type=float, default=BenchmarkSettings.FAKE_LLM_LATENCY_MEDIAN_MS)
+    parser.add_argument("--latency-sigma", type=float, default=BenchmarkSettings.FAKE_LLM_LATENCY_SIGMA)
+    parser.add_argument("--error-rate", type=float, default=BenchmarkSettings.FAKE_LLM_ERROR_RATE)
+    parser.add_argument("--throttle-share", type=float, default=BenchmarkSettings.FAKE_LLM_THROTTLE_SHARE)
+    parser.add_argument("--seed", type=int, default=BenchmarkSettings.FAKE_LLM_SEED)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    server = serve(args.host, args.port, FakeLLMBehaviour(
+        args.latency_median_ms, args.latency_sigma, args.error_rate, args.throttle_share, args.seed
+    ))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+from src.settings.settings import PDFBenchmarkSettings, PDFExtractorSettings
+from src.benchmark.pdf_corpus import generate_corpus
+from src.utils.pdf_extractor import PDFExtractor, shutdown_ocr_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+def measure_document(pdf_path: str):
+    # Runs in a fresh process so the RSS high-water mark belongs to this document only
+    started_at = time.perf_counter()
+    result = PDFExtractor().extract_from_path(pdf_path)
+    elapsed_seconds = time.perf_counter() - started_at
+    # OCR pool processes and their tesseract runs only show up in RUSAGE_CHILDREN once reaped
+    shutdown_ocr_pool()
+    self_peak_bytes = max(result.peak_rss_bytes, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+    child_peak_bytes = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+
+    return {
+        "pages": len(result.page_texts),
+        "ocr_pages": result.page_routes.count(PDFExtractorSettings.ROUTE_OCR),
+        "seconds": elapsed_seconds,
+        "chars": len(result.text),
+        # ru_maxrss of children is the largest single child, added to this process's own peak
+        "peak_rss_bytes": self_peak_bytes + child_peak_bytes,
+        "peak_child_rss_bytes": child_peak_bytes,
+        "peak_raster_bytes": result.peak_raster_bytes,
+    }
+
+
+def run_benchmark(corpus_paths: Dict[str, str], repeats: int = PDFBenchmarkSettings.REPEATS):
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+        for name, path in corpus_paths.items():
+            runs = [executor.submit(measure_document, path).result() for _ in range(repeats)]
+            pages = max(runs[0]["pages"], 1)
+            results[name] = {
+                "pages": runs[0]["pages"],
+                "ocr_pages": runs[0]["ocr_pages"],
+                "seconds_per_page": statistics.median(run["seconds"] for run in runs) / pages,
+                "peak_rss_bytes": statistics.median(run["peak_rss_bytes"] for run in runs),
+                "peak_child_rss_bytes": statistics.median(run["peak_child_rss_bytes"] for run in runs),
+                "peak_raster_bytes": max(run["peak_raster_bytes"] for run in runs),
+                "chars": runs[0]["chars"],
+            }
+            logger.info(
+                f"{name}: {results[name]['pages']} pages ({results[name]['ocr_pages']} OCR), "
+                f"{results[name]['seconds_per_page'] * 1000:.1f} ms/page, "
+                f"peak RSS {results[name]['peak_rss_bytes'] / 2 ** 20:.1f} MiB "
+                f"({results[name]['peak_child_rss_bytes'] / 2 ** 20:.1f} MiB in OCR children), "
+                f"{results[name]['chars']} chars"
+            )
+    return results
+
+
+def find_regressions(results: Dict, baseline: Dict,
+                     max_seconds_per_page_ratio: float = PDFBenchmarkSettings.MAX_SECONDS_PER_PAGE_RATIO,
+                     max_peak_rss_ratio: float = PDFBenchmarkSettings.MAX_PEAK_RSS_RATIO,
+                     min_chars_ratio: float = PDFBenchmarkSettings.MIN_CHARS_RATIO):
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            logger.warning(f"{name} has no baseline yet")
+            continue
+
+        if result["seconds_per_page"] > expected["seconds_per_page"] * max_seconds_per_page_ratio:
+            regressions.append(
+                f"{name}: {result['seconds_per_page'] * 1000:.1f} ms/page vs baseline "
+                f"{expected['seconds_per_page'] * 1000:.1f} ms/page (limit x{max_seconds_per_page_ratio})"
+            )
+        if result["peak_rss_bytes"] > expected["peak_rss_bytes"] * max_peak_rss_ratio:
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss_bytes'] / 2 ** 20:.1f} MiB vs baseline "
+                f"{expected['peak_rss_bytes'] / 2 ** 20:.1f} MiB (limit x{max_peak_rss_ratio})"
+            )
+        if result["chars"] < expected["chars"] * min_chars_ratio:
+            regressions.append(
+                f"{name}: {result['chars']} chars vs baseline {expected['chars']} (floor x{min_chars_ratio})"
+            )
+    return regressions
+
+
+def load_baseline(baseline_path: str):
+    if not os.path.exists(baseline_path):
+        return None
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(results: Dict, baseline_path: str):
+    os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+    with open(baseline_path, "w", encoding="utf-8") as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDFExtractor against a synthetic CV corpus")
+    parser.add_argument("--corpus-dir", default=PDFBenchmarkSettings.CORPUS_DIR)
+    parser.add_argument("--baseline", default=PDFBenchmarkSettings.BASELINE_PATH)
+    parser.add_argument("--repeats", type=int, default=PDFBenchmarkSettings.REPEATS)
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the corpus even if it exists")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--max-time-ratio", type=float, default=PDFBenchmarkSettings.MAX_SECONDS_PER_PAGE_RATIO)
+    parser.add_argument("--max-rss-ratio", type=float, default=PDFBenchmarkSettings.MAX_PEAK_RSS_RATIO)
+    parser.add_argument("--min-chars-ratio", type=float, default=PDFBenchmarkSettings.MIN_CHARS_RATIO)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    corpus_paths = generate_corpus(args.corpus_dir, overwrite=args.regenerate)
+    results = run_benchmark(corpus_paths, max(1, args.repeats))
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline or baseline is None:
+        save_baseline(results, args.baseline)
+        logger.info(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = find_regressions(results, baseline, args.max_time_ratio, args.max_rss_ratio, args.min_chars_ratio)
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+    logger.info("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
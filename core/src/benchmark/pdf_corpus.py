@@ -0,0 +1,86 @@
+import os
+
+import fitz
+
+from src.settings.settings import PDFBenchmarkSettings
+
+
+ENGLISH_SECTIONS = [
+    ("Objective", "Backend engineer with a focus on reliable data services and clean APIs."),
+    ("Experience", "2019 - present: Senior Software Engineer at Acme Corp. Built ingestion pipelines in Python, "
+                   "tuned PostgreSQL queries and led a team of four engineers."),
+    ("Experience", "2016 - 2019: Software Engineer at Globex. Developed REST services with FastAPI and Docker."),
+    ("Skills", "Python, SQL, FastAPI, Docker, Kubernetes, PostgreSQL, Redis, Airflow, AWS"),
+    ("Education", "B.Sc. in Computer Science, Hanoi University of Science and Technology"),
+    ("Certificates", "AWS Certified Solutions Architect - Associate"),
+]
+
+VIETNAMESE_SECTIONS = [
+    ("Mục tiêu", "Kỹ sư phần mềm mong muốn phát triển hệ thống dữ liệu ổn định và dễ mở rộng."),
+    ("Kinh nghiệm", "2019 - nay: Kỹ sư phần mềm cao cấp tại Công ty Cổ phần Công nghệ Việt. Xây dựng dịch vụ "
+                    "xử lý dữ liệu bằng Python và tối ưu truy vấn PostgreSQL."),
+    ("Kỹ năng", "Python, SQL, FastAPI, Docker, Kubernetes, PostgreSQL, làm việc nhóm, giao tiếp"),
+    ("Học vấn", "Cử nhân Khoa học Máy tính, Trường Đại học Bách khoa Hà Nội"),
+    ("Chứng chỉ", "Chứng chỉ tiếng Anh IELTS 7.0"),
+]
+
+
+def section_html(sections, page_number: int):
+    body = "".join(f"<h3>{title}</h3><p>{text}</p>" for title, text in sections)
+    return f"<h2>Curriculum Vitae - page {page_number + 1}</h2>{body}"
+
+
+def add_text_page(document, sections, page_number: int):
+    page = document.new_page()
+    page.insert_htmlbox(page.rect + (54, 54, -54, -54), section_html(sections, page_number))
+    return page
+
+
+def add_scanned_page(document, sections, page_number: int, zoom: float = 2.0):
+    # Render a text page to a raster and place only the image, as a scanner would produce
+    with fitz.open() as source:
+        add_text_page(source, sections, page_number)
+        pix = source[0].get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    page = document.new_page()
+    page.insert_image(page.rect, pixmap=pix)
+    return page
+
+
+def write_document(path: str, page_builders):
+    document = fitz.open()
+    try:
+        for page_number, build_page in enumerate(page_builders):
+            build_page(document, page_number)
+        document.save(path, garbage=3, deflate=True)
+    finally:
+        document.close()
+
+
+def corpus_specs():
+    text_page = lambda document, page_number: add_text_page(document, ENGLISH_SECTIONS, page_number)
+    scanned_page = lambda document, page_number: add_scanned_page(document, ENGLISH_SECTIONS, page_number)
+    vietnamese_page = lambda document, page_number: add_text_page(document, VIETNAMESE_SECTIONS, page_number)
+    vietnamese_scanned_page = lambda document, page_number: add_scanned_page(document, VIETNAMESE_SECTIONS, page_number)
+
+    return {
+        "text_only": [text_page],
+        "scanned_only": [scanned_page],
+        "mixed": [text_page, scanned_page, text_page],
+        "multi_page": [text_page] * PDFBenchmarkSettings.MULTI_PAGE_CV_PAGES,
+        "vietnamese": [vietnamese_page, vietnamese_scanned_page],
+        "very_large": [
+            scanned_page if page_number % 4 == 3 else text_page
+            for page_number in range(PDFBenchmarkSettings.LARGE_CV_PAGES)
+        ],
+    }
+
+
+def generate_corpus(corpus_dir: str = PDFBenchmarkSettings.CORPUS_DIR, overwrite: bool = False):
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = {}
+    for name, page_builders in corpus_specs().items():
+        path = os.path.join(corpus_dir, f"{name}.pdf")
+        if overwrite or not os.path.exists(path):
+            write_document(path, page_builders)
+        paths[name] = path
+    return paths
@@ -0,0 +1,235 @@
+import argparse
+import datetime
+import hashlib
+import io
+import logging
+import math
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import fitz
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from src.settings.settings import BenchmarkSettings, display_startup_message
+from src.agents.extractor.extractor_agent import extract_candidate_cv
+from src.agents.evaluator.evaluator_agent import evaluate_candidates
+from src.db.models import Candidate, Job
+from src.db.schema import upgrade_schema
+from src.db.session import Base, SessionLocal, engine
+from src.utils.minio import minio_agent_recruiment
+
+
+logger = logging.getLogger(__name__)
+
+SKILLS = ["Python", "SQL", "FastAPI", "Docker", "Kubernetes", "PostgreSQL", "React", "Machine Learning",
+          "Airflow", "Spark", "Go", "Terraform", "AWS", "Linux", "Pandas", "TypeScript"]
+
+
+def percentile(values: List[float], percent: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def stage_report(name: str, latencies: List[float], candidates: int, failures: int, wall_seconds: float):
+    report = {
+        "stage": name,
+        "candidates": candidates,
+        "failures": failures,
+        "wall_seconds": wall_seconds,
+        "candidates_per_second": candidates / wall_seconds if wall_seconds else 0.0,
+    }
+    for percent in BenchmarkSettings.PERCENTILES:
+        report[f"p{percent}_seconds"] = percentile(latencies, percent)
+    return report
+
+
+def synthetic_cv_pdf(index: int):
+    skills = [SKILLS[(index * 3 + offset) % len(SKILLS)] for offset in range(5)]
+    lines = [
+        f"Benchmark Candidate {index}",
+        f"Objective: backend engineer focused on {skills[0]} and {skills[1]}.",
+        "Experience:",
+        f"- {2015 + index % 8} - present: Software Engineer at Company {index % 13}, built services in {skills[0]}.",
+        f"- {2012 + index % 5} - {2015 + index % 8}: Developer at Studio {index % 7}, worked with {skills[2]}.",
+        "Skills: " + ", ".join(skills),
+        f"Education: B.Sc. Computer Science, University {index % 11}",
+        f"Certificates: {skills[3]} Associate",
+    ]
+    document = fitz.open()
+    try:
+        page = document.new_page()
+        for line_number, line in enumerate(lines):
+            page.insert_text((72, 72 + line_number * 18), line, fontsize=11)
+        return document.tobytes()
+    finally:
+        document.close()
+
+
+def seed_benchmark_data(candidates: int, db: Session):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    job = Job(
+        title="Benchmark Backend Engineer",
+        job_type="Full-time",
+        qualifications="Python, SQL, FastAPI, Docker, PostgreSQL; 3+ years building backend services.",
+        responsibilities="Design, build and operate APIs and data pipelines.",
+        benefits="Benchmark benefits.",
+        work_schedule="Monday to Friday",
+        location="Remote",
+        is_open=True,
+        created_date=now,
+        updated_date=now,
+    )
+    db.add(job)
+    db.flush()
+
+    candidate_ids = []
+    for index in range(candidates):
+        pdf_bytes = synthetic_cv_pdf(index)
+        cv_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+        object_name = f"{BenchmarkSettings.OBJECT_PREFIX}/{cv_sha256}.pdf"
+        minio_agent_recruiment.client.put_object(
+            minio_agent_recruiment.bucket_name, object_name, io.BytesIO(pdf_bytes), len(pdf_bytes),
+            content_type="application/pdf"
+        )
+        candidate = Candidate(
+            name=f"{BenchmarkSettings.CANDIDATE_PREFIX}-{index}",
+            phone_number="0000000000",
+            email=f"{BenchmarkSettings.CANDIDATE_PREFIX}-{index}@example.com",
+            year_of_birth=1990 + index % 10,
+            job_id=job.id,
+            job_type=job.job_type,
+            CV_directory=object_name,
+            cv_sha256=cv_sha256,
+            created_date=now,
+            updated_date=now,
+        )
+        db.add(candidate)
+        db.flush()
+        candidate_ids.append(candidate.id)
+
+    db.commit()
+    return job.id, candidate_ids
+
+
+def remove_benchmark_data(job_id: int, candidate_ids: List[int], db: Session):
+    object_names = [
+        object_name for object_name, in
+        db.query(Candidate.CV_directory).filter(Candidate.id.in_(candidate_ids)).all()
+    ]
+    db.query(Candidate).filter(Candidate.id.in_(candidate_ids)).delete(synchronize_session=False)
+    db.query(Job).filter(Job.id == job_id).delete(synchronize_session=False)
+    db.commit()
+    for object_name in object_names:
+        minio_agent_recruiment.client.remove_object(minio_agent_recruiment.bucket_name, object_name)
+
+
+def timed_extraction(candidate_id: int):
+    db = SessionLocal()
+    started_at = time.perf_counter()
+    try:
+        result = extract_candidate_cv(candidate_id, db)
+        success = not isinstance(result, JSONResponse)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Benchmark extraction of candidate {candidate_id} failed: {e}")
+        success = False
+    finally:
+        db.close()
+    return time.perf_counter() - started_at, success
+
+
+def run_extract_stage(candidate_ids: List[int], workers: int):
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        outcomes = list(executor.map(timed_extraction, candidate_ids))
+    wall_seconds = time.perf_counter() - started_at
+
+    return stage_report(
+        "extract",
+        [latency for latency, _ in outcomes],
+        len(candidate_ids),
+        sum(1 for _, success in outcomes if not success),
+        wall_seconds,
+    )
+
+
+def run_evaluate_stage(candidate_ids: List[int], job_id: int, batch_size: int, evaluation_mode: str | None):
+    latencies = []
+    failures = 0
+    started_at = time.perf_counter()
+    for start in range(0, len(candidate_ids), batch_size):
+        batch = candidate_ids[start:start + batch_size]
+        db = SessionLocal()
+        batch_started_at = time.perf_counter()
+        try:
+            response = evaluate_candidates(batch, job_id, db, evaluation_mode=evaluation_mode,
+                                           prescreen_top_n=None, prescreen_min_score=None)
+            if isinstance(response, JSONResponse):
+                failures += len(batch)
+            else:
+                failures += sum(1 for result in response if not result.success)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Benchmark evaluation of batch {batch} failed: {e}")
+            failures += len(batch)
+        finally:
+            db.close()
+        latencies.append(time.perf_counter() - batch_started_at)
+    wall_seconds = time.perf_counter() - started_at
+
+    return stage_report(f"evaluate (batches of {batch_size})", latencies, len(candidate_ids), failures, wall_seconds)
+
+
+def format_report(report: Dict):
+    percentiles = ", ".join(
+        f"p{percent}={report[f'p{percent}_seconds']:.3f}s"
+        for percent in BenchmarkSettings.PERCENTILES
+        if report[f"p{percent}_seconds"] is not None
+    )
+    return (
+        f"{report['stage']}: {report['candidates']} candidates in {report['wall_seconds']:.2f}s "
+        f"({report['candidates_per_second']:.2f} candidates/sec, {report['failures']} failed), {percentiles}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction and evaluation end to end")
+    parser.add_argument("--candidates", type=int, default=BenchmarkSettings.CANDIDATES)
+    parser.add_argument("--extract-workers", type=int, default=BenchmarkSettings.EXTRACT_WORKERS)
+    parser.add_argument("--evaluate-batch-size", type=int, default=BenchmarkSettings.EVALUATE_BATCH_SIZE)
+    parser.add_argument("--evaluation-mode")
+    parser.add_argument("--keep-data", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    display_startup_message()
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+    db = SessionLocal()
+    try:
+        job_id, candidate_ids = seed_benchmark_data(args.candidates, db)
+        logger.info(f"Seeded job {job_id} with {len(candidate_ids)} candidates")
+        try:
+            reports = [
+                run_extract_stage(candidate_ids, args.extract_workers),
+                run_evaluate_stage(candidate_ids, job_id, args.evaluate_batch_size, args.evaluation_mode),
+            ]
+            for report in reports:
+                logger.info(format_report(report))
+        finally:
+            if not args.keep_data:
+                remove_benchmark_data(job_id, candidate_ids, db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
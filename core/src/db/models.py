@@ -1,4 +1,4 @@
-from sqlalchemy import func, Column, Integer, Text, DateTime, Boolean, ForeignKey, Float
+from sqlalchemy import func, Column, Integer, Text, DateTime, Boolean, ForeignKey, Float, JSON
 from src.db.session import Base
 
 
@@ -30,6 +30,7 @@ class Candidate(Base):
         "jobs.id", ondelete="SET NULL"))
     job_type = Column(Text, nullable=False)
     CV_directory = Column(Text)
+    cv_sha256 = Column(Text, index=True)
     extract_objective = Column(Text)
     extract_experiences = Column(Text)
     extract_skills = Column(Text)
@@ -37,5 +38,26 @@ class Candidate(Base):
     extract_certificate = Column(Text)
     score = Column(Float)
     summary_reason = Column(Text)
+    score_fingerprint = Column(Text)
     created_date = Column(DateTime, nullable=False, default=func.now())
-    updated_date = Column(DateTime, nullable=False, default=func.now())
\ No newline at end of file
+    updated_date = Column(DateTime, nullable=False, default=func.now())
+
+
+class Task(Base):
+    __tablename__ = "core_tasks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_type = Column(Text, index=True, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # Set by callers that may deliver the same request twice, e.g. the HR outbox
+    dedupe_key = Column(Text, unique=True)
+    status = Column(Text, index=True, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    available_at = Column(DateTime, index=True, nullable=False, default=func.now())
+    lease_owner = Column(Text)
+    lease_expires_at = Column(DateTime)
+    last_error = Column(Text)
+    result = Column(JSON)
+    created_date = Column(DateTime, nullable=False, default=func.now())
+    updated_date = Column(DateTime, nullable=False, default=func.now())
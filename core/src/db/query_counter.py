@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.settings.settings import QueryInstrumentationSettings
+
+
+logger = logging.getLogger(__name__)
+
+# A mutable holder, so queries run in threadpool copies of the request or task context still count.
+# Readers take deltas, since the holder outlives one request in long-lived threads
+_query_stats: ContextVar[Dict | None] = ContextVar("query_stats", default=None)
+_query_stats_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def new_query_stats(parent: Dict | None = None, track_statements: bool = False):
+    return {
+        "queries": 0,
+        "seconds": 0.0,
+        "statements": Counter() if track_statements else None,
+        "parent": parent,
+    }
+
+
+def current_query_stats():
+    stats = _query_stats.get()
+    if stats is None:
+        stats = new_query_stats()
+        _query_stats.set(stats)
+    return stats
+
+
+def parameters_shape(parameters, executemany: bool):
+    # Types only, bound values may hold personal data
+    if executemany and isinstance(parameters, (list, tuple)):
+        return f"{len(parameters)} x {parameters_shape(parameters[0], False) if parameters else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def install_query_counter(engine: Engine):
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        elapsed_seconds = time.perf_counter() - conn.info["query_started_at"].pop()
+        if elapsed_seconds >= QueryInstrumentationSettings.SLOW_QUERY_SECONDS:
+            logger.warning(
+                f"Slow query ({elapsed_seconds * 1000:.1f} ms): {' '.join(statement.split())[:500]} "
+                f"params {parameters_shape(parameters, executemany)}"
+            )
+
+        stats = _query_stats.get()
+        with _query_stats_lock:
+            # Nested units of work roll up into every enclosing holder
+            while stats is not None:
+                stats["queries"] += 1
+                stats["seconds"] += elapsed_seconds
+                if stats["statements"] is not None:
+                    stats["statements"][statement] += 1
+                stats = stats["parent"]
+
+
+def repeated_statements(stats: Dict, threshold: int = QueryInstrumentationSettings.N_PLUS_ONE_THRESHOLD):
+    return {statement: count for statement, count in (stats["statements"] or {}).items() if count >= threshold}
+
+
+def check_query_budget(name: str, stats: Dict, budget: int | None, mode: str = QueryInstrumentationSettings.BUDGET_MODE):
+    if budget is None or mode == "off" or stats["queries"] <= budget:
+        return
+    message = f"{name} issued {stats['queries']} queries, budget is {budget}"
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+@contextmanager
+def query_scope(name: str):
+    """One unit of work (a request or task); logs repeated statements when it ends. The caller may rename it."""
+    parent = _query_stats.get()
+    stats = new_query_stats(parent, track_statements=True)
+    stats["name"] = name
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+        for statement, count in repeated_statements(stats).items():
+            logger.warning(
+                f"Possible N+1 in {stats['name']}: statement ran {count} times: {' '.join(statement.split())[:300]}"
+            )
+
+
+@contextmanager
+def query_budget(max_queries: int, name: str = "block"):
+    """Test helper: raises QueryBudgetExceeded when the block issues more than max_queries queries."""
+    with query_scope(name) as stats:
+        yield stats
+    check_query_budget(name, stats, max_queries, mode="raise")
+
+
+def with_query_stats(fn):
+    """Wraps fn so it counts into the caller's unit of work when run on an executor thread."""
+    stats = _query_stats.get()
+
+    def run(*args, **kwargs):
+        token = _query_stats.set(stats)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _query_stats.reset(token)
+    return run
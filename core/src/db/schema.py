@@ -0,0 +1,20 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# create_all only creates missing tables, columns added to existing tables are upgraded here.
+# Every statement is idempotent, both services run them at startup after create_all
+SCHEMA_UPGRADES = [
+    "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS cv_sha256 TEXT",
+    "CREATE INDEX IF NOT EXISTS ix_candidates_cv_sha256 ON candidates (cv_sha256)",
+    "ALTER TABLE candidates ADD COLUMN IF NOT EXISTS score_fingerprint TEXT",
+    "ALTER TABLE core_tasks ADD COLUMN IF NOT EXISTS dedupe_key TEXT UNIQUE",
+]
+# Serializes the upgrade between the two services and the worker processes starting together
+SCHEMA_UPGRADE_LOCK_ID = 7204211
+
+
+def upgrade_schema(engine: Engine):
+    with engine.begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SCHEMA_UPGRADE_LOCK_ID})
+        for statement in SCHEMA_UPGRADES:
+            connection.execute(text(statement))
@@ -2,13 +2,17 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from src.settings.settings import PostgresSettings
+from src.db.query_counter import install_query_counter
+from src.utils.metrics import instrument_session_commits
 
 postgres_settings = PostgresSettings()
 
 SQLALCHEMY_DATABASE_URL = postgres_settings.SQLALCHEMY_DATABASE_URI
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
+install_query_counter(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_session_commits(SessionLocal)
 
 Base = declarative_base()
 
@@ -19,13 +19,70 @@ def display_startup_message():
 class PDFExtractorSettings:
 
     ZOOM_CONST = 2
+    # Rasters are grayscale and shrunk below ZOOM_CONST when a page would exceed this
+    MAX_PAGE_PIXELS: int = int(os.getenv("PDF_MAX_PAGE_PIXELS", str(4_000_000)))
+    # 0 or 1 keeps OCR in the calling process; unset splits the cores between worker processes
+    OCR_WORKERS: int | None = int(os.getenv("PDF_OCR_WORKERS")) if os.getenv("PDF_OCR_WORKERS") else None
+    OCR_MAX_PAGES_IN_FLIGHT: int = int(os.getenv("PDF_OCR_MAX_PAGES_IN_FLIGHT", "4"))
+
+    ROUTE_TEXT: str = "text"
+    ROUTE_OCR: str = "ocr"
+    # A page is OCR'd when its text layer is nearly empty and it has images, or when
+    # images cover most of it and the little text it has is sparse (captions, stamps)
+    PAGE_MIN_TEXT_CHARS: int = 30
+    PAGE_MIN_TEXT_DENSITY: float = 2.0
+    PAGE_IMAGE_COVERAGE_FOR_OCR: float = 0.5
+
+
+class TextCompactionSettings:
+
+    ENABLED: bool = os.getenv("TEXT_COMPACTION_ENABLED", "true").lower() == "true"
+    MAX_PROMPT_TOKENS: int = int(os.getenv("CV_MAX_PROMPT_TOKENS", "6000"))
+    # A line on at least this share of pages (and at least 2) is header/footer boilerplate
+    BOILERPLATE_MIN_PAGE_RATIO: float = 0.6
+    # Letterless lines with fewer digits than this share are OCR noise
+    NOISE_MIN_ALNUM_RATIO: float = 0.4
+    APPROX_CHARS_PER_TOKEN: int = 4
+
+
+class ExtractorSettings:
+
+    EXTRACTION_MODE_TWO_STEP: str = "two_step"
+    EXTRACTION_MODE_SINGLE_CALL: str = "single_call"
+    EXTRACTION_MODES: tuple = (EXTRACTION_MODE_TWO_STEP, EXTRACTION_MODE_SINGLE_CALL)
+    # How OCR'd CVs are processed: correct then extract, or both in one structured call
+    EXTRACTION_MODE: str = os.getenv("EXTRACTION_MODE", EXTRACTION_MODE_TWO_STEP)
+    USAGE_KEY: str = "extraction"
+
+
+class PrescreenSettings:
+
+    # Raw BM25 scores of the job text against extract_skills/experiences/education, with IDF
+    # and average length taken over all applicants of the job
+    DEFAULT_TOP_N: int | None = int(os.getenv("PRESCREEN_TOP_N")) if os.getenv("PRESCREEN_TOP_N") else None
+    DEFAULT_MIN_SCORE: float | None = float(os.getenv("PRESCREEN_MIN_SCORE")) if os.getenv("PRESCREEN_MIN_SCORE") else None
+
+
+class EvaluatorSettings:
+
+    MAX_IN_FLIGHT: int = int(os.getenv("EVALUATOR_MAX_IN_FLIGHT", "8"))
+
+    EVALUATION_MODE_SINGLE: str = "single"
+    EVALUATION_MODE_PACKED: str = "packed"
+    EVALUATION_MODES: tuple = (EVALUATION_MODE_SINGLE, EVALUATION_MODE_PACKED)
+    EVALUATION_MODE: str = os.getenv("EVALUATION_MODE", EVALUATION_MODE_SINGLE)
+    # Packed mode scores up to PACK_SIZE candidates of one job per call, packs
+    # whose prompt exceeds PACK_MAX_PROMPT_TOKENS are halved until they fit
+    PACK_SIZE: int = int(os.getenv("EVALUATION_PACK_SIZE", "5"))
+    PACK_MAX_PROMPT_TOKENS: int = int(os.getenv("EVALUATION_PACK_MAX_PROMPT_TOKENS", "16000"))
+    CANDIDATE_ID: str = "candidate_id"
+    EVALUATIONS: str = "evaluations"
 
 
 class GeneralCoreSettings:
 
     PREFIX: str = "/recruitment_agent/core"
     TOKEN: str = os.getenv("TOKEN", "")
-    TMP_CANDIDATE_FOLDER: str = "tmp_candidate_folder"
 
     EXTRACT_OBJECTIVE: str = "extract_objective"
     EXTRACT_EXPERIENCES: str = "extract_experiences"
@@ -38,25 +95,177 @@ class GeneralCoreSettings:
     APP_TITLE: str = "Agent Recruitment Core Application"
 
 
+class BatchSettings:
+
+    BACKEND_OPENAI: str = "openai"
+    BACKEND_LOCAL: str = "local"
+    BACKEND: str = os.getenv("BATCH_BACKEND", BACKEND_OPENAI)
+    WORK_DIR: str = os.getenv("BATCH_WORK_DIR", "batch_jobs")
+    POLL_INTERVAL_SECONDS: float = float(os.getenv("BATCH_POLL_INTERVAL_SECONDS", "60"))
+    COMPLETION_WINDOW: str = "24h"
+    ENDPOINT: str = "/v1/chat/completions"
+
+    KIND_EXTRACT: str = "extract"
+    KIND_EVALUATE: str = "evaluate"
+
+    STATUS_COMPLETED: str = "completed"
+    TERMINAL_STATUSES: tuple = ("completed", "failed", "expired", "cancelled")
+
+
+class TaskQueueSettings:
+
+    STATUS_PENDING: str = "pending"
+    STATUS_RUNNING: str = "running"
+    STATUS_SUCCEEDED: str = "succeeded"
+    STATUS_FAILED: str = "failed"
+
+    TASK_EXTRACT_CANDIDATE_CV: str = "extract_candidate_cv"
+    TASK_EVALUATE_CANDIDATES: str = "evaluate_candidates"
+    TASK_REFRESH_JOB_SCORES: str = "refresh_job_scores"
+
+    LEASE_SECONDS: int = int(os.getenv("TASK_LEASE_SECONDS", "300"))
+    HEARTBEAT_SECONDS: int = int(os.getenv("TASK_HEARTBEAT_SECONDS", "30"))
+    MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+    RETRY_BASE_SECONDS: int = int(os.getenv("TASK_RETRY_BASE_SECONDS", "10"))
+    RETRY_MAX_SECONDS: int = int(os.getenv("TASK_RETRY_MAX_SECONDS", "600"))
+    POLL_INTERVAL_SECONDS: float = float(os.getenv("TASK_POLL_INTERVAL_SECONDS", "2"))
+    WORKER_PROCESSES: int = int(os.getenv("TASK_WORKER_PROCESSES", "1"))
+
+
 class MinioSettings:
 
     MINIO_ENDPOINT: str = os.getenv('MINIO_ENDPOINT')
     MINIO_ACCESS_KEY: str = os.getenv('MINIO_ACCESS_KEY')
     MINIO_SECRET_KEY: str = os.getenv('MINIO_SECRET_KEY')
     MINIO_BUCKET_NAME: str = os.getenv('MINIO_BUCKET_NAME')
+    MAX_OBJECT_BYTES: int = int(os.getenv('MINIO_MAX_OBJECT_BYTES', str(50 * 1024 * 1024)))
+    READ_CHUNK_BYTES: int = 256 * 1024
 
 
 class OpenAISettings:
 
     MODEL: str = "gpt-4o"
     LLM_API_KEY: str = os.getenv("LLM_API_KEY")
+    # Points the client at an OpenAI-compatible server, e.g. the benchmark's fake LLM
+    LLM_BASE_URL: str | None = os.getenv("LLM_BASE_URL")
 
     SYSTEM_ROLE: str = "assistant"
     SYSTEM_CONTENT_FOR_PARAGRAPH_CORRECTION_PROMPT: str = "You are a helpful assistant specializing in spelling and grammar correction."
     SYSTEM_CONTENT_FOR_EXTRACTION: str = "You are an assistant that extracts candidate information from their CV/resume."
+    SYSTEM_CONTENT_FOR_CORRECTION_EXTRACTION: str = "You are an assistant that repairs OCR errors in CVs/resumes and extracts candidate information from them."
     SYSTEM_CONTENT_FOR_EVALUATION: str = "You are a strict HR assistant who evaluates job candidates on a scale from 0 to 100, based on the candidate’s information and the job they are applying for."
 
 
+class MetricsSettings:
+
+    ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Set (and shared) when the API and the worker processes should be scraped as one
+    MULTIPROC_DIR: str | None = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    WORKER_PORT: int | None = int(os.getenv("WORKER_METRICS_PORT")) if os.getenv("WORKER_METRICS_PORT") else None
+    ENDPOINT: str = "/metrics"
+
+
+class ProfilingSettings:
+
+    # Profiles are taken for requests carrying HEADER=TOKEN (tasks they enqueue inherit it),
+    # or for a SAMPLE_RATE share of requests and tasks while the toggle in DIR is on
+    DIR: str = os.getenv("PROFILING_DIR", "profiles")
+    HEADER: str = "X-Profile"
+    TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+    INTERVAL_SECONDS: float = float(os.getenv("PROFILING_INTERVAL_SECONDS", "0.005"))
+    TOP_STACKS: int = 30
+    PAYLOAD_KEY: str = "profile"
+
+
+class QueryInstrumentationSettings:
+
+    SLOW_QUERY_SECONDS: float = float(os.getenv("SLOW_QUERY_SECONDS", "0.2"))
+    # Identical statements repeated this often within one request or task are reported as a likely N+1
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+    # off, warn or raise; raise fails the request or task over its budget, meant for tests
+    BUDGET_MODE: str = os.getenv("QUERY_BUDGET_MODE", "warn")
+    # Keyed by route template or task type; tasks scale with their candidates, so they have none by default
+    DEFAULT_BUDGET: int = 10
+    BUDGETS: dict = {
+        "/recruitment_agent/core/extract_candidate_cv/": 2,
+        "/recruitment_agent/core/extract_candidates_cv/": 1,
+        "/recruitment_agent/core/evaluate_candidate": 2,
+        "/recruitment_agent/core/tasks/{task_id}": 2,
+        "/recruitment_agent/core/tasks/stats": 2,
+    }
+
+
+class CompletionCacheSettings:
+
+    ENABLED: bool = os.getenv("COMPLETION_CACHE_ENABLED", "true").lower() == "true"
+    DB_PATH: str = os.getenv("COMPLETION_CACHE_PATH", "completion_cache/completions.sqlite3")
+    TTL_SECONDS: int = int(os.getenv("COMPLETION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    MAX_ENTRIES: int = int(os.getenv("COMPLETION_CACHE_MAX_ENTRIES", "50000"))
+    EVICTION_INTERVAL: int = 100
+
+
+class RateLimitSettings:
+
+    ENABLED: bool = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # Shared by every core process on the host through a locked state file
+    STATE_PATH: str = os.getenv("LLM_RATE_LIMIT_STATE_PATH", "rate_limit/openai_rate_limit.json")
+    REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+    TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+    EXPECTED_COMPLETION_TOKENS: int = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "800"))
+
+    INITIAL_CONCURRENCY: float = float(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+    MIN_CONCURRENCY: float = 1.0
+    MAX_CONCURRENCY: float = float(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    ADDITIVE_INCREASE: float = 1.0
+    MULTIPLICATIVE_DECREASE: float = 0.5
+    SLOT_LEASE_SECONDS: float = 300.0
+
+    DEFAULT_RETRY_AFTER_SECONDS: float = 5.0
+    MAX_RETRIES: int = int(os.getenv("LLM_RATE_LIMIT_MAX_RETRIES", "5"))
+    # Exponential backoff for 5xx, timeouts and connection errors
+    RETRY_BACKOFF_SECONDS: float = 0.5
+    MAX_RETRY_BACKOFF_SECONDS: float = 8.0
+    MAX_WAIT_STEP_SECONDS: float = 1.0
+
+
+class BenchmarkSettings:
+
+    FAKE_LLM_HOST: str = os.getenv("FAKE_LLM_HOST", "0.0.0.0")
+    FAKE_LLM_PORT: int = int(os.getenv("FAKE_LLM_PORT", "8089"))
+    # Log-normal latency: median in milliseconds and sigma of the underlying normal
+    FAKE_LLM_LATENCY_MEDIAN_MS: float = float(os.getenv("FAKE_LLM_LATENCY_MEDIAN_MS", "800"))
+    FAKE_LLM_LATENCY_SIGMA: float = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+    FAKE_LLM_ERROR_RATE: float = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.0"))
+    # Share of injected errors answered with 429 + Retry-After instead of 500
+    FAKE_LLM_THROTTLE_SHARE: float = float(os.getenv("FAKE_LLM_THROTTLE_SHARE", "0.5"))
+    FAKE_LLM_RETRY_AFTER_SECONDS: float = 1.0
+    FAKE_LLM_SEED: int = int(os.getenv("FAKE_LLM_SEED", "7"))
+
+    CANDIDATES: int = 50
+    EXTRACT_WORKERS: int = 8
+    EVALUATE_BATCH_SIZE: int = 10
+    CANDIDATE_PREFIX: str = "benchmark-candidate"
+    OBJECT_PREFIX: str = "benchmark"
+    PERCENTILES: tuple = (50, 95, 99)
+
+
+class PDFBenchmarkSettings:
+
+    CORPUS_DIR: str = os.getenv("PDF_BENCHMARK_CORPUS_DIR", "benchmark_corpus/pdf")
+    BASELINE_PATH: str = os.getenv("PDF_BENCHMARK_BASELINE_PATH", "benchmark_results/pdf_baseline.json")
+    REPEATS: int = int(os.getenv("PDF_BENCHMARK_REPEATS", "3"))
+    LARGE_CV_PAGES: int = 40
+    MULTI_PAGE_CV_PAGES: int = 6
+
+    # A document regresses when it exceeds the baseline by these ratios
+    MAX_SECONDS_PER_PAGE_RATIO: float = float(os.getenv("PDF_BENCHMARK_MAX_TIME_RATIO", "1.25"))
+    MAX_PEAK_RSS_RATIO: float = float(os.getenv("PDF_BENCHMARK_MAX_RSS_RATIO", "1.20"))
+    # ... or extracts fewer characters than this share of the baseline
+    MIN_CHARS_RATIO: float = float(os.getenv("PDF_BENCHMARK_MIN_CHARS_RATIO", "0.95"))
+
+
 class PostgresSettings:
 
     DATABASE_NAME: str = os.getenv('POSTGRES_DB', "recruitment")
@@ -64,7 +273,10 @@ class PostgresSettings:
     DATABASE_PASSWORD: str = os.getenv('POSTGRES_PASSWORD', "recruitment")
     DATABASE_HOST: str = os.getenv('POSTGRES_HOST', "127.0.0.1")
     DATABASE_PORT: str = os.getenv('POSTGRES_PORT', "5432")
+    DATABASE_URL: str | None = os.getenv('DATABASE_URL')
 
     @property
     def SQLALCHEMY_DATABASE_URI(self):
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"postgresql+psycopg://{self.DATABASE_USER}:{self.DATABASE_PASSWORD}@{self.DATABASE_HOST}:{self.DATABASE_PORT}/{self.DATABASE_NAME}"
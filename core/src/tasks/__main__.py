@@ -0,0 +1,7 @@
+from src.tasks.worker import main
+
+# `python -m src.tasks` starts the workers. Spawned children (the OCR pool) skip re-importing
+# a package __main__, whereas `python -m src.tasks.worker` would re-import the whole worker
+# module, and its MinIO, OpenAI and cache singletons, into every OCR process
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import datetime
+import logging
+
+from typing import Dict, List
+from sqlalchemy import and_, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.db.models import Task
+from src.settings.settings import TaskQueueSettings
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_task(task_type: str, payload: Dict, db: Session,
+                 max_attempts: int = TaskQueueSettings.MAX_ATTEMPTS):
+    try:
+        task = Task(
+            task_type=task_type,
+            payload=payload,
+            status=TaskQueueSettings.STATUS_PENDING,
+            attempts=0,
+            max_attempts=max_attempts,
+            available_at=func.now(),
+            created_date=func.now(),
+            updated_date=func.now(),
+        )
+        db.add(task)
+        db.flush()
+        db.commit()
+
+        return task
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in enqueue task", e)
+
+
+def enqueue_tasks(task_type: str, payloads: List[Dict], dedupe_keys: List[str | None], db: Session,
+                  max_attempts: int = TaskQueueSettings.MAX_ATTEMPTS):
+    try:
+        # Rows whose dedupe key already exists are skipped, which makes redelivery harmless
+        task_ids = db.execute(
+            insert(Task).values([
+                {
+                    "task_type": task_type,
+                    "payload": payload,
+                    "dedupe_key": dedupe_key,
+                    "status": TaskQueueSettings.STATUS_PENDING,
+                    "attempts": 0,
+                    "max_attempts": max_attempts,
+                    "available_at": func.now(),
+                    "created_date": func.now(),
+                    "updated_date": func.now(),
+                }
+                for payload, dedupe_key in zip(payloads, dedupe_keys)
+            ]).on_conflict_do_nothing(index_elements=[Task.dedupe_key]).returning(Task.id)
+        ).scalars().all()
+        db.commit()
+
+        return task_ids
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in enqueue tasks", e)
+
+
+def claim_task(worker_id: str, db: Session,
+               lease_seconds: int = TaskQueueSettings.LEASE_SECONDS):
+    try:
+        while True:
+            # Pending tasks that are due, or running tasks whose worker stopped heartbeating
+            task = db.query(Task).filter(
+                or_(
+                    and_(Task.status == TaskQueueSettings.STATUS_PENDING,
+                         Task.available_at <= func.now()),
+                    and_(Task.status == TaskQueueSettings.STATUS_RUNNING,
+                         Task.lease_expires_at < func.now()),
+                )
+            ).order_by(Task.available_at, Task.id) \
+                .with_for_update(skip_locked=True) \
+                .first()
+
+            if not task:
+                db.commit()
+                return None
+
+            if task.status == TaskQueueSettings.STATUS_RUNNING and task.attempts >= task.max_attempts:
+                task.status = TaskQueueSettings.STATUS_FAILED
+                task.last_error = f"Lease of {task.lease_owner} expired on the last attempt"
+                task.lease_owner = None
+                task.lease_expires_at = None
+                task.updated_date = func.now()
+                db.commit()
+                continue
+
+            task.status = TaskQueueSettings.STATUS_RUNNING
+            task.attempts += 1
+            task.lease_owner = worker_id
+            task.lease_expires_at = func.now() + datetime.timedelta(seconds=lease_seconds)
+            task.updated_date = func.now()
+            db.commit()
+            db.refresh(task)
+
+            return task
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in claim task", e)
+
+
+def heartbeat_task(task_id: int, worker_id: str, db: Session,
+                   lease_seconds: int = TaskQueueSettings.LEASE_SECONDS):
+    try:
+        updated_rows = db.query(Task).filter(
+            Task.id == task_id,
+            Task.lease_owner == worker_id,
+            Task.status == TaskQueueSettings.STATUS_RUNNING,
+        ).update({
+            Task.lease_expires_at: func.now() + datetime.timedelta(seconds=lease_seconds),
+            Task.updated_date: func.now(),
+        }, synchronize_session=False)
+        db.commit()
+
+        return updated_rows == 1
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in heartbeat task", e)
+
+
+def complete_task(task_id: int, worker_id: str, result, db: Session):
+    try:
+        updated_rows = db.query(Task).filter(
+            Task.id == task_id,
+            Task.lease_owner == worker_id,
+            Task.status == TaskQueueSettings.STATUS_RUNNING,
+        ).update({
+            Task.status: TaskQueueSettings.STATUS_SUCCEEDED,
+            Task.result: result,
+            Task.last_error: None,
+            Task.lease_owner: None,
+            Task.lease_expires_at: None,
+            Task.updated_date: func.now(),
+        }, synchronize_session=False)
+        db.commit()
+
+        if updated_rows != 1:
+            logger.warning(f"Task {task_id} finished after {worker_id} lost its lease")
+        return updated_rows == 1
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in complete task", e)
+
+
+def retry_delay_seconds(attempts: int):
+    return min(
+        TaskQueueSettings.RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+        TaskQueueSettings.RETRY_MAX_SECONDS
+    )
+
+
+def fail_task(task_id: int, worker_id: str, error: str, db: Session):
+    try:
+        task = db.query(Task).filter(
+            Task.id == task_id,
+            Task.lease_owner == worker_id,
+            Task.status == TaskQueueSettings.STATUS_RUNNING,
+        ).with_for_update().first()
+        if not task:
+            db.commit()
+            logger.warning(f"Task {task_id} failed after {worker_id} lost its lease")
+            return None
+
+        task.last_error = error
+        task.lease_owner = None
+        task.lease_expires_at = None
+        task.updated_date = func.now()
+        if task.attempts >= task.max_attempts:
+            task.status = TaskQueueSettings.STATUS_FAILED
+        else:
+            task.status = TaskQueueSettings.STATUS_PENDING
+            task.available_at = func.now() + datetime.timedelta(
+                seconds=retry_delay_seconds(task.attempts)
+            )
+        db.commit()
+        db.refresh(task)
+
+        return task
+    except Exception as e:
+        db.rollback()
+        raise Exception("Error occured in fail task", e)
+
+
+def get_task(task_id: int, db: Session):
+    try:
+        return db.query(Task).filter(Task.id == task_id).first()
+    except Exception as e:
+        raise Exception("Error occured in get task", e)
+
+
+def get_queue_stats(db: Session):
+    try:
+        counts = db.query(Task.status, func.count(Task.id)).group_by(Task.status).all()
+        stats = {status: count for status, count in counts}
+        stats["depth"] = stats.get(TaskQueueSettings.STATUS_PENDING, 0)
+
+        return stats
+    except Exception as e:
+        raise Exception("Error occured in get queue stats", e)
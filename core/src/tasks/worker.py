@@ -0,0 +1,185 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import uuid
+
+from typing import Callable, Dict
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from src.settings.settings import (
+    MetricsSettings, ProfilingSettings, QueryInstrumentationSettings, TaskQueueSettings, display_startup_message
+)
+from src.agents.extractor.extractor_agent import extract_candidate_cv
+from src.agents.evaluator.evaluator_agent import evaluate_candidates, refresh_job_scores
+from src.db.models import Task
+from src.db.query_counter import check_query_budget, query_scope
+from src.db.schema import upgrade_schema
+from src.db.session import Base, SessionLocal, engine
+from src.tasks.task_queue import claim_task, complete_task, fail_task, heartbeat_task
+from src.utils.metrics import start_metrics_server, track_in_flight
+from src.utils.profiler import profile, should_profile
+
+
+logger = logging.getLogger(__name__)
+
+
+def to_task_result(result):
+    if isinstance(result, JSONResponse):
+        raise Exception(result.body.decode())
+    if isinstance(result, BaseModel):
+        return result.model_dump(mode="json")
+    if isinstance(result, list):
+        return [to_task_result(item) for item in result]
+    if isinstance(result, dict):
+        return {key: to_task_result(value) for key, value in result.items()}
+    return result
+
+
+TASK_HANDLERS: Dict[str, Callable[[Dict, Session], object]] = {
+    TaskQueueSettings.TASK_EXTRACT_CANDIDATE_CV: lambda payload, db: extract_candidate_cv(
+        payload["candidate_id"], db, payload.get("extraction_mode")
+    ),
+    TaskQueueSettings.TASK_EVALUATE_CANDIDATES: lambda payload, db: evaluate_candidates(
+        payload["candidate_ids"], payload["job_id"], db,
+        evaluation_mode=payload.get("evaluation_mode"),
+        prescreen_top_n=payload.get("prescreen_top_n"),
+        prescreen_min_score=payload.get("prescreen_min_score")
+    ),
+    TaskQueueSettings.TASK_REFRESH_JOB_SCORES: lambda payload, db: refresh_job_scores(
+        payload["job_id"], db, evaluation_mode=payload.get("evaluation_mode")
+    ),
+}
+
+
+class Heartbeat(threading.Thread):
+
+    def __init__(self, task_id: int, worker_id: str):
+        super().__init__(daemon=True)
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(TaskQueueSettings.HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                if not heartbeat_task(self.task_id, self.worker_id, db):
+                    logger.warning(f"Worker {self.worker_id} lost the lease on task {self.task_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Heartbeat failed for task {self.task_id}: {e}")
+            finally:
+                db.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+def run_handler(handler, task: Task, db: Session):
+    if not (task.payload.get(ProfilingSettings.PAYLOAD_KEY) or should_profile(None)):
+        return handler(task.payload, db)
+
+    # A worker runs one task at a time, so sampling every thread also covers its evaluator pool
+    with profile(f"task {task.task_type} {task.id}") as report:
+        report.update({"task_id": task.id, "task_type": task.task_type, "attempt": task.attempts})
+        return handler(task.payload, db)
+
+
+def run_task(task: Task, worker_id: str):
+    handler = TASK_HANDLERS.get(task.task_type)
+    heartbeat = Heartbeat(task.id, worker_id)
+    heartbeat.start()
+
+    db = SessionLocal()
+    try:
+        if handler is None:
+            raise Exception(f"Unknown task type {task.task_type}")
+        with track_in_flight(task.task_type), query_scope(f"task {task.task_type} {task.id}") as query_stats:
+            result = to_task_result(run_handler(handler, task, db))
+        check_query_budget(query_stats["name"], query_stats,
+                           QueryInstrumentationSettings.BUDGETS.get(task.task_type))
+        complete_task(task.id, worker_id, result, db)
+        logger.info(f"Task {task.id} ({task.task_type}) succeeded on attempt {task.attempts}")
+    except Exception as e:
+        db.rollback()
+        try:
+            failed_task = fail_task(task.id, worker_id, repr(e), db)
+            status = failed_task.status if failed_task else "lost"
+        except Exception as fail_error:
+            # The lease expires and another worker picks the task up again
+            status = f"unrecorded ({fail_error})"
+        logger.error(f"Task {task.id} ({task.task_type}) attempt {task.attempts} failed, now {status}: {e}")
+    finally:
+        heartbeat.stop()
+        db.close()
+
+
+def run_worker(worker_id: str | None = None):
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+
+    logger.info(f"Worker {worker_id} started")
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            task = claim_task(worker_id, db)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} could not claim a task: {e}")
+            task = None
+        finally:
+            db.close()
+
+        if task is None:
+            stop_event.wait(TaskQueueSettings.POLL_INTERVAL_SECONDS)
+            continue
+
+        run_task(task, worker_id)
+
+    logger.info(f"Worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run core task queue workers")
+    parser.add_argument("--processes", type=int, default=TaskQueueSettings.WORKER_PROCESSES)
+    args = parser.parse_args()
+    # Forked workers inherit this and size their OCR pools to a share of the cores
+    TaskQueueSettings.WORKER_PROCESSES = max(1, args.processes)
+
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s - %(processName)s - %(levelname)s - %(message)s")
+    display_startup_message()
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    if MetricsSettings.ENABLED and MetricsSettings.WORKER_PORT:
+        # Without PROMETHEUS_MULTIPROC_DIR only this parent process is visible on the port
+        start_metrics_server(MetricsSettings.WORKER_PORT)
+
+    if args.processes <= 1:
+        run_worker()
+        return
+
+    # Children get a fresh connection pool instead of sharing the parent's sockets
+    engine.dispose()
+    processes = [
+        multiprocessing.Process(target=run_worker, name=f"worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: [p.terminate() for p in processes])
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
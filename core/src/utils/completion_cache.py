@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Dict
+
+from src.settings.settings import CompletionCacheSettings
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int,
+                 eviction_interval: int = CompletionCacheSettings.EVICTION_INTERVAL):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.eviction_interval = eviction_interval
+
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # One connection per process, opened on first use and shared by the evaluator threads
+        # under the lock; WAL lets several core processes share the same file
+        self._conn = None
+        self._conn_pid = None
+        self._inherited_conns = []
+        # A thread of the parent may hold the lock at fork time, the child starts with a fresh one
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # SQLite connections must not cross fork(): a forked worker opens its own and leaves the
+        # inherited one untouched, closing it could checkpoint or unlock the parent's WAL
+        if self._conn_pid != os.getpid():
+            if self._conn is not None:
+                self._inherited_conns.append(self._conn)
+            self._conn = self._connect()
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                completion TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_completions_last_accessed ON completions (last_accessed)"
+        )
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def make_key(model: str, system_role: str, system_content: str, prompts: str,
+                 response_format: Dict | None = None, prefix_prompts: str | None = None):
+        key_parts = [model, system_role, system_content, prompts]
+        if response_format is not None or prefix_prompts is not None:
+            key_parts.extend([response_format, prefix_prompts])
+        payload = json.dumps(key_parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT completion, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE completions SET last_accessed = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, completion: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, completion, now, now)
+            )
+            conn.commit()
+
+            self._writes += 1
+            if self._writes % self.eviction_interval == 0:
+                self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            conn.commit()
+
+    def _evict(self, now: float):
+        conn = self._connection()
+        expired = conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        # Least recently used entries go first once the store is over its size
+        overflow = conn.execute(
+            """
+            DELETE FROM completions WHERE key IN (
+                SELECT key FROM completions ORDER BY last_accessed DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,)
+        ).rowcount
+        conn.commit()
+
+        if expired or overflow:
+            logger.info(f"Completion cache evicted {expired} expired and {overflow} overflow entries")
+
+    def stats(self):
+        with self._lock:
+            conn = self._connection()
+            size = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "size": size,
+            }
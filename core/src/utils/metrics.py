@@ -0,0 +1,100 @@
+import time
+
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    start_http_server
+)
+from sqlalchemy import event
+
+from src.settings.settings import MetricsSettings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "core_http_request_seconds", "HTTP request latency per route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+MINIO_DOWNLOAD_SECONDS = Histogram(
+    "core_minio_download_seconds", "Time to fetch a CV object from MinIO", buckets=LATENCY_BUCKETS
+)
+MINIO_DOWNLOAD_BYTES = Histogram(
+    "core_minio_download_bytes", "Size of CV objects fetched from MinIO", buckets=BYTES_BUCKETS
+)
+PDF_PARSE_SECONDS = Histogram(
+    "core_pdf_parse_seconds", "Time to extract text from a whole PDF, OCR included", buckets=LATENCY_BUCKETS
+)
+OCR_PAGE_SECONDS = Histogram(
+    "core_ocr_page_seconds", "Tesseract time per page", buckets=LATENCY_BUCKETS
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "core_llm_request_seconds", "LLM completion latency per prompt type", ["prompt_type"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "core_llm_tokens", "LLM tokens per prompt type", ["prompt_type", "kind"]
+)
+DB_COMMIT_SECONDS = Histogram(
+    "core_db_commit_seconds", "Time spent in session commits", buckets=LATENCY_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    "core_in_flight", "Background work currently running", ["kind"], multiprocess_mode="livesum"
+)
+TASK_QUEUE_DEPTH = Gauge(
+    "core_task_queue_depth", "Tasks per status in the task queue", ["status"], multiprocess_mode="max"
+)
+
+
+@contextmanager
+def observe_seconds(histogram, **labels):
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(time.perf_counter() - started_at)
+
+
+@contextmanager
+def track_in_flight(kind: str):
+    gauge = IN_FLIGHT.labels(kind=kind)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def instrument_session_commits(session_factory):
+
+    @event.listens_for(session_factory, "before_commit")
+    def start_commit_timer(session):
+        session.info["commit_started_at"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_commit")
+    def observe_commit(session):
+        started_at = session.info.pop("commit_started_at", None)
+        if started_at is not None:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started_at)
+
+
+def metrics_registry():
+    if not MetricsSettings.MULTIPROC_DIR:
+        return None
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    registry = metrics_registry()
+    return generate_latest(registry) if registry is not None else generate_latest(), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int):
+    registry = metrics_registry()
+    if registry is not None:
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
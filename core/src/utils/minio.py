@@ -1,10 +1,10 @@
 import logging
-import os
 
 from minio import Minio
 from minio.error import S3Error
 
 from src.settings.settings import MinioSettings
+from src.utils.metrics import MINIO_DOWNLOAD_BYTES, MINIO_DOWNLOAD_SECONDS, observe_seconds
 
 
 logger = logging.getLogger(__name__)
@@ -31,18 +31,27 @@ class MinioForAgentRecruiment:
         if not self.client.bucket_exists(bucket_name):
             self.client.make_bucket(bucket_name)
 
-    def download_file(self, folder_prefix: str, download_path: str):
+    def get_object_bytes(self, object_name: str, max_bytes: int = MinioSettings.MAX_OBJECT_BYTES):
+        response = None
         try:
-            os.makedirs(os.path.dirname(download_path), exist_ok=True)
-            
-            objects = self.client.list_objects(self.bucket_name, prefix=folder_prefix, recursive=True)
-            
-            for object in objects:
-                self.client.fget_object(self.bucket_name, object.object_name, download_path)
-                logger.info(f"Downloaded: {object.object_name} -> {download_path}")
-
+            with observe_seconds(MINIO_DOWNLOAD_SECONDS):
+                response = self.client.get_object(self.bucket_name, object_name)
+                buffer = bytearray()
+                for chunk in response.stream(MinioSettings.READ_CHUNK_BYTES):
+                    buffer.extend(chunk)
+                    if len(buffer) > max_bytes:
+                        raise ValueError(f"Object {object_name} is larger than {max_bytes} bytes")
+            MINIO_DOWNLOAD_BYTES.observe(len(buffer))
+
+            logger.info(f"Fetched: {object_name} ({len(buffer)} bytes)")
+            return bytes(buffer)
         except S3Error as err:
-            logger.info(f"Error downloading: {err}")
+            logger.error(f"Error fetching {object_name}: {err}")
+            raise
+        finally:
+            if response is not None:
+                response.close()
+                response.release_conn()
 
 
 minio_agent_recruiment = MinioForAgentRecruiment(
@@ -0,0 +1,30 @@
+import os
+import time
+
+import pytesseract
+
+from PIL import Image
+
+# Runs inside the OCR pool's spawned processes: keep imports to PIL and pytesseract so
+# a child does not build the settings, metrics, MinIO or OpenAI state of its parent
+
+
+def init_ocr_worker():
+    # The pool already spreads pages over the cores, one tesseract thread per process
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def ocr_page(samples, width: int, height: int, stride: int):
+    # frombuffer wraps the grayscale samples instead of copying them
+    img = Image.frombuffer("L", (width, height), samples, "raw", "L", stride, 1)
+    try:
+        return pytesseract.image_to_string(img)
+    finally:
+        img.close()
+
+
+def timed_ocr_page(samples, width: int, height: int, stride: int):
+    # The OCR pool is a separate process, so the duration travels back with the text
+    started_at = time.perf_counter()
+    text = ocr_page(samples, width, height, stride)
+    return text, time.perf_counter() - started_at
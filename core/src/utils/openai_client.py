@@ -1,24 +1,149 @@
-from openai import OpenAI
-from src.settings.settings import OpenAISettings
+import logging
+import random
+import time
+
+from typing import Callable, Dict
+from openai import APIConnectionError, APIStatusError, OpenAI, RateLimitError
+from src.settings.settings import OpenAISettings, CompletionCacheSettings, RateLimitSettings
+from src.utils.completion_cache import CompletionCache
+from src.utils.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, observe_seconds, track_in_flight
+from src.utils.rate_limiter import SharedRateLimiter, parse_retry_after
+from src.utils.text_compactor import count_tokens
+from src.utils.usage_tracker import UsageTracker
+
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TYPES = {
+    OpenAISettings.SYSTEM_CONTENT_FOR_PARAGRAPH_CORRECTION_PROMPT: "correction",
+    OpenAISettings.SYSTEM_CONTENT_FOR_EXTRACTION: "extraction",
+    OpenAISettings.SYSTEM_CONTENT_FOR_CORRECTION_EXTRACTION: "correction_extraction",
+    OpenAISettings.SYSTEM_CONTENT_FOR_EVALUATION: "evaluation",
+}
 
 
 class RecruitmentOpenAI:
     
     def __init__(self):
-        self.client = OpenAI(api_key=OpenAISettings.LLM_API_KEY)
+        self.rate_limiter = SharedRateLimiter() if RateLimitSettings.ENABLED else None
+        # With the shared limiter in charge, 429s, 5xx and connection errors are retried in
+        # create_rate_limited instead of by the SDK, so every attempt goes through a slot
+        self.client = OpenAI(
+            api_key=OpenAISettings.LLM_API_KEY,
+            base_url=OpenAISettings.LLM_BASE_URL,
+            max_retries=0 if self.rate_limiter is not None else 2,
+        )
+        self.cache = CompletionCache(
+            db_path=CompletionCacheSettings.DB_PATH,
+            ttl_seconds=CompletionCacheSettings.TTL_SECONDS,
+            max_entries=CompletionCacheSettings.MAX_ENTRIES,
+        ) if CompletionCacheSettings.ENABLED else None
+        self.usage = UsageTracker()
         
-    def get_completions(self, prompts: str, system_role: str, system_content: str):
-        completion = self.client.chat.completions.create(
-            model=OpenAISettings.MODEL,
-            messages=[
-                {"role": system_role, "content": system_content},
-                {
-                    "role": "user",
-                    "content": prompts
-                }
-            ]
+    @staticmethod
+    def build_request_body(prompts: str, system_role: str, system_content: str,
+                           response_format: Dict | None = None, prefix_prompts: str | None = None):
+        messages = [{"role": system_role, "content": system_content}]
+        # Static instructions first, per-call content last, so the prefix is cacheable
+        if prefix_prompts:
+            messages.append({"role": "user", "content": prefix_prompts})
+        messages.append({"role": "user", "content": prompts})
+
+        request_body = {
+            "model": OpenAISettings.MODEL,
+            "messages": messages,
+        }
+        if response_format:
+            request_body["response_format"] = response_format
+        return request_body
+
+    def record_usage(self, usage_key: str | None, usage, prompt_type: str = "other"):
+        if usage is None:
+            return
+        prompt_tokens_details = getattr(usage, "prompt_tokens_details", None)
+        cached_prompt_tokens = getattr(prompt_tokens_details, "cached_tokens", None) or 0
+        LLM_TOKENS.labels(prompt_type=prompt_type, kind="prompt").inc(usage.prompt_tokens)
+        LLM_TOKENS.labels(prompt_type=prompt_type, kind="cached_prompt").inc(cached_prompt_tokens)
+        LLM_TOKENS.labels(prompt_type=prompt_type, kind="completion").inc(usage.completion_tokens)
+        self.usage.record(
+            usage_key or "default",
+            prompt_tokens=usage.prompt_tokens,
+            cached_prompt_tokens=cached_prompt_tokens,
+            completion_tokens=usage.completion_tokens,
         )
-        return completion.choices[0].message.content
+        logger.debug(
+            f"LLM usage [{usage_key}]: prompt={usage.prompt_tokens} cached={cached_prompt_tokens} "
+            f"completion={usage.completion_tokens}"
+        )
+
+    @staticmethod
+    def is_transient_error(error: Exception):
+        # The same errors the SDK retries on its own, minus 429 which the limiter handles
+        if isinstance(error, APIConnectionError):
+            return True
+        return isinstance(error, APIStatusError) and (error.status_code in (408, 409) or error.status_code >= 500)
+
+    def create_rate_limited(self, request_body: Dict, prefix_prompts: str | None, prompts: str):
+        estimated_tokens = count_tokens((prefix_prompts or "") + prompts) + RateLimitSettings.EXPECTED_COMPLETION_TOKENS
+        attempt = 0
+        while True:
+            slot_id = self.rate_limiter.acquire(estimated_tokens)
+            try:
+                completion = self.client.chat.completions.create(**request_body)
+            except RateLimitError as e:
+                retry_after = parse_retry_after(getattr(e.response, "headers", None))
+                self.rate_limiter.release(slot_id, estimated_tokens, throttled=True, retry_after=retry_after)
+                attempt += 1
+                if attempt > RateLimitSettings.MAX_RETRIES:
+                    raise
+                continue
+            except Exception as e:
+                self.rate_limiter.release(slot_id, estimated_tokens, failed=True)
+                attempt += 1
+                if not self.is_transient_error(e) or attempt > RateLimitSettings.MAX_RETRIES:
+                    raise
+                backoff = min(RateLimitSettings.RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1),
+                              RateLimitSettings.MAX_RETRY_BACKOFF_SECONDS)
+                logger.warning(f"LLM request failed ({e!r}), retrying in {backoff:.1f}s")
+                time.sleep(backoff * random.uniform(0.5, 1.0))
+                continue
+
+            used_tokens = completion.usage.total_tokens if completion.usage is not None else None
+            self.rate_limiter.release(slot_id, estimated_tokens, used_tokens=used_tokens)
+            return completion
+
+    def get_completions(self, prompts: str, system_role: str, system_content: str,
+                        use_cache: bool = True, response_format: Dict | None = None,
+                        prefix_prompts: str | None = None, usage_key: str | None = None,
+                        parse: Callable[[str], object] | None = None):
+        # With parse, the parsed result is returned and only completions that parse are cached
+        use_cache = use_cache and self.cache is not None
+        if use_cache:
+            cache_key = CompletionCache.make_key(
+                OpenAISettings.MODEL, system_role, system_content, prompts, response_format, prefix_prompts
+            )
+            cached_completion = self.cache.get(cache_key)
+            if cached_completion is not None:
+                try:
+                    return parse(cached_completion) if parse is not None else cached_completion
+                except Exception as e:
+                    logger.warning(f"Evicting cached completion that does not parse: {e!r}")
+                    self.cache.delete(cache_key)
+
+        prompt_type = PROMPT_TYPES.get(system_content, "other")
+        request_body = self.build_request_body(prompts, system_role, system_content, response_format, prefix_prompts)
+        with track_in_flight("llm_request"), observe_seconds(LLM_REQUEST_SECONDS, prompt_type=prompt_type):
+            if self.rate_limiter is None:
+                completion = self.client.chat.completions.create(**request_body)
+            else:
+                completion = self.create_rate_limited(request_body, prefix_prompts, prompts)
+        content = completion.choices[0].message.content
+        self.record_usage(usage_key, completion.usage, prompt_type)
+
+        result = parse(content) if parse is not None else content
+        if use_cache and content is not None:
+            self.cache.set(cache_key, content)
+        return result
     
     
-recruitment_openai = RecruitmentOpenAI()
\ No newline at end of file
+recruitment_openai = RecruitmentOpenAI()
@@ -1,39 +1,221 @@
+import math
+import multiprocessing
+import os
+import resource
+import threading
+
 import fitz
-import pytesseract
 
-from PIL import Image
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List
+from pydantic import BaseModel
+
+from src.settings.settings import PDFExtractorSettings, TaskQueueSettings
+from src.utils.metrics import OCR_PAGE_SECONDS, PDF_PARSE_SECONDS, observe_seconds
+from src.utils.ocr_worker import init_ocr_worker, ocr_page, timed_ocr_page
+
+
+_ocr_pool: ProcessPoolExecutor | None = None
+_ocr_pool_lock = threading.Lock()
+
+
+def default_ocr_workers():
+    if PDFExtractorSettings.OCR_WORKERS is not None:
+        return PDFExtractorSettings.OCR_WORKERS
+    # Every worker process has its own pool, so they split the cores between them
+    return max(1, (os.cpu_count() or 1) // max(1, TaskQueueSettings.WORKER_PROCESSES))
+
+
+def get_ocr_pool(max_workers: int):
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # spawn, since the worker process also runs evaluator and heartbeat threads
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_ocr_worker
+            )
+        return _ocr_pool
+
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=True)
+            _ocr_pool = None
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux, the high-water mark is the best we have
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RasterMemoryTracker:
+
+    def __init__(self):
+        self.live_raster_bytes = 0
+        self.peak_raster_bytes = 0
+        self.peak_rss_bytes = current_rss_bytes()
+
+    def acquire(self, raster_bytes: int):
+        self.live_raster_bytes += raster_bytes
+        self.peak_raster_bytes = max(self.peak_raster_bytes, self.live_raster_bytes)
+        self.sample_rss()
+
+    def release(self, raster_bytes: int):
+        self.live_raster_bytes -= raster_bytes
+
+    def sample_rss(self):
+        self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes())
+
+
+class PDFExtractionResult(BaseModel):
+    text: str
+    is_two_step: bool
+    page_texts: List[str]
+    page_routes: List[str]
+    peak_raster_bytes: int = 0
+    peak_rss_bytes: int = 0
 
-from src.settings.settings import PDFExtractorSettings
 
 class PDFExtractor:
     
-    def __init__(self):
-        pass
+    def __init__(self, ocr_workers: int | None = None,
+                 max_pages_in_flight: int = PDFExtractorSettings.OCR_MAX_PAGES_IN_FLIGHT):
+        self.ocr_workers = default_ocr_workers() if ocr_workers is None else ocr_workers
+        self.max_pages_in_flight = max(1, max_pages_in_flight)
     
     def extract_from_path(self, pdf_path: str):
-        extracted_texts = self.__pdf_to_text_direct(pdf_path)
-        if extracted_texts:
-            return (extracted_texts, False)
-        
-        return (self.__pdf_to_text_deeply(pdf_path), True)
-    
-    def __pdf_to_text_direct(self, pdf_path):
-        doc = fitz.open(pdf_path)
-        extracted_texts = ""
+        with fitz.open(pdf_path) as doc:
+            return self.extract_from_document(doc)
+
+    def extract_from_stream(self, pdf_bytes: bytes):
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return self.extract_from_document(doc)
+
+    def extract_from_document(self, doc):
+        with observe_seconds(PDF_PARSE_SECONDS):
+            return self.__extract_from_document(doc)
+
+    def __extract_from_document(self, doc):
+        memory_tracker = RasterMemoryTracker()
+        page_texts = []
+        page_routes = []
         for page in doc:
-            extracted_texts += page.get_text("text")
-        return extracted_texts
+            text = page.get_text("text")
+            page_texts.append(text)
+            page_routes.append(self.classify_page(page, text))
+
+        ocr_page_nums = [
+            page_num for page_num, route in enumerate(page_routes)
+            if route == PDFExtractorSettings.ROUTE_OCR
+        ]
+        ocr_texts = self.__pdf_to_text_deeply(doc, ocr_page_nums, memory_tracker)
+        for page_num, text in zip(ocr_page_nums, ocr_texts):
+            page_texts[page_num] = text
+        memory_tracker.sample_rss()
+
+        return PDFExtractionResult(
+            text="\n".join(page_texts),
+            is_two_step=bool(ocr_page_nums),
+            page_texts=page_texts,
+            page_routes=page_routes,
+            peak_raster_bytes=memory_tracker.peak_raster_bytes,
+            peak_rss_bytes=memory_tracker.peak_rss_bytes,
+        )
+
+    @staticmethod
+    def classify_page(page, text: str):
+        page_area = abs(page.rect)
+        if not page_area:
+            return PDFExtractorSettings.ROUTE_TEXT
+
+        text_chars = len("".join(text.split()))
+        # Characters per square inch of page, 72 points per inch
+        text_density = text_chars / (page_area / (72 * 72))
+
+        image_area = 0.0
+        for image_info in page.get_image_info():
+            image_area += abs(fitz.Rect(image_info["bbox"]) & page.rect)
+        image_coverage = min(image_area / page_area, 1.0)
+
+        # Blank or short pages without images (a trailing page of a typed CV) have nothing to OCR
+        if text_chars < PDFExtractorSettings.PAGE_MIN_TEXT_CHARS and image_coverage > 0:
+            return PDFExtractorSettings.ROUTE_OCR
+        if (image_coverage >= PDFExtractorSettings.PAGE_IMAGE_COVERAGE_FOR_OCR
+                and text_density < PDFExtractorSettings.PAGE_MIN_TEXT_DENSITY):
+            return PDFExtractorSettings.ROUTE_OCR
+        return PDFExtractorSettings.ROUTE_TEXT
+
+    @staticmethod
+    def raster_zoom(page, zoom=PDFExtractorSettings.ZOOM_CONST,
+                    max_pixels=PDFExtractorSettings.MAX_PAGE_PIXELS):
+        page_area = abs(page.rect)
+        if not page_area:
+            return zoom
+        # Large A3 or poster pages keep the pixel count under max_pixels
+        return min(zoom, math.sqrt(max_pixels / page_area))
+
+    def __render_page(self, doc, page_num):
+        page = doc.load_page(page_num)
+        zoom = self.raster_zoom(page)
+        matrix = fitz.Matrix(zoom, zoom)  # Apply zoom
+        return page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+
+    def __ocr_page_in_process(self, doc, page_num, memory_tracker: RasterMemoryTracker):
+        pix = self.__render_page(doc, page_num)
+        raster_bytes = len(pix.samples_mv)
+        memory_tracker.acquire(raster_bytes)
+        try:
+            with observe_seconds(OCR_PAGE_SECONDS):
+                return ocr_page(pix.samples_mv, pix.width, pix.height, pix.stride)
+        finally:
+            pix = None
+            memory_tracker.release(raster_bytes)
     
-    def __pdf_to_text_deeply(self, pdf_path, zoom=PDFExtractorSettings.ZOOM_CONST):
-        doc = fitz.open(pdf_path)
-        extracted_texts = ""
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            matrix = fitz.Matrix(zoom, zoom)  # Apply zoom
-            pix = page.get_pixmap(matrix=matrix)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            text = pytesseract.image_to_string(img)
-            extracted_texts += f"\n{text}"
-        
-        return extracted_texts
+    def __pdf_to_text_deeply(self, doc, page_nums: List[int], memory_tracker: RasterMemoryTracker):
+        if self.ocr_workers <= 1 or len(page_nums) <= 1:
+            return [
+                self.__ocr_page_in_process(doc, page_num, memory_tracker)
+                for page_num in page_nums
+            ]
+
+        return self.__ocr_pages_parallel(doc, page_nums, memory_tracker)
+
+    def __ocr_pages_parallel(self, doc, page_nums: List[int], memory_tracker: RasterMemoryTracker):
+        pool = get_ocr_pool(self.ocr_workers)
+        page_texts = [""] * len(page_nums)
+        in_flight = {}
+
+        def collect(future):
+            index, raster_bytes = in_flight.pop(future)
+            memory_tracker.release(raster_bytes)
+            page_texts[index], ocr_seconds = future.result()
+            OCR_PAGE_SECONDS.observe(ocr_seconds)
+
+        # Pages are rendered lazily so at most max_pages_in_flight rasters are alive
+        for index, page_num in enumerate(page_nums):
+            if len(in_flight) >= self.max_pages_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+
+            pix = self.__render_page(doc, page_num)
+            # Only plain bytes cross the process boundary, the pixmap is dropped right away
+            samples = pix.samples
+            future = pool.submit(timed_ocr_page, samples, pix.width, pix.height, pix.stride)
+            pix = None
+            in_flight[future] = (index, len(samples))
+            memory_tracker.acquire(len(samples))
+            del samples
+
+        for future in wait(in_flight).done:
+            collect(future)
+
+        return page_texts
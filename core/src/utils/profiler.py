@@ -0,0 +1,189 @@
+import asyncio
+import datetime
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Set
+
+from fastapi.routing import APIRoute
+
+from src.settings.settings import ProfilingSettings
+from src.db.query_counter import current_query_stats
+
+
+logger = logging.getLogger(__name__)
+
+# Threads of the request being profiled, filled in by the threadpool thread running its endpoint
+_profiled_thread_ids: ContextVar[Set[int] | None] = ContextVar("profiled_thread_ids", default=None)
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Samples the Python stacks of the given threads (all but itself when None) at a fixed interval."""
+
+    def __init__(self, interval_seconds: float, thread_ids: Set[int] | None = None):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.interval_seconds = interval_seconds
+        self.thread_ids = thread_ids
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval_seconds):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                self.stacks[fold_stack(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class ProfilingToggle:
+    """On/off switch and sample rate kept in a small file, so every process picks changes up without a restart."""
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self.state = {"enabled": ProfilingSettings.ENABLED, "sample_rate": ProfilingSettings.SAMPLE_RATE}
+        self.state_mtime = None
+
+    def get(self):
+        try:
+            mtime = os.path.getmtime(self.state_path)
+            if mtime != self.state_mtime:
+                with open(self.state_path, encoding="utf-8") as state_file:
+                    self.state = json.load(state_file)
+                self.state_mtime = mtime
+        except (OSError, ValueError):
+            pass
+        return self.state
+
+    def set(self, enabled: bool, sample_rate: float):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        state = {"enabled": enabled, "sample_rate": min(max(sample_rate, 0.0), 1.0)}
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.state_path)
+        return self.get()
+
+
+profiling_toggle = ProfilingToggle(os.path.join(ProfilingSettings.DIR, "toggle.json"))
+
+
+def profile_requested(header_value: str | None):
+    return bool(header_value and ProfilingSettings.TOKEN
+                and hmac.compare_digest(header_value, ProfilingSettings.TOKEN))
+
+
+def should_profile(header_value: str | None):
+    if profile_requested(header_value):
+        return True
+    state = profiling_toggle.get()
+    return state["enabled"] and random.random() < state["sample_rate"]
+
+
+def write_profile(report, stacks: Counter):
+    os.makedirs(ProfilingSettings.DIR, exist_ok=True)
+    base_name = os.path.join(
+        ProfilingSettings.DIR,
+        f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}_{re.sub(r'[^A-Za-z0-9]+', '_', report['name']).strip('_')}"
+        f"_{report['profile_id']}"
+    )
+    report["top_stacks"] = [
+        {"stack": stack, "samples": count} for stack, count in stacks.most_common(ProfilingSettings.TOP_STACKS)
+    ]
+    with open(f"{base_name}.json", "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+    # Collapsed stacks, readable by flamegraph.pl and speedscope
+    with open(f"{base_name}.folded", "w", encoding="utf-8") as folded_file:
+        for stack, count in stacks.items():
+            folded_file.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile(name: str, thread_ids: Set[int] | None = None):
+    report = {"profile_id": uuid.uuid4().hex[:12], "name": name}
+    query_stats = current_query_stats()
+    queries_before, query_seconds_before = query_stats["queries"], query_stats["seconds"]
+    sampler = StackSampler(ProfilingSettings.INTERVAL_SECONDS, thread_ids)
+    started_at, cpu_started_at = time.perf_counter(), time.process_time()
+    sampler.start()
+    try:
+        yield report
+    finally:
+        sampler.stop()
+        report.update({
+            "wall_seconds": time.perf_counter() - started_at,
+            "process_cpu_seconds": time.process_time() - cpu_started_at,
+            "db_queries": query_stats["queries"] - queries_before,
+            "db_seconds": query_stats["seconds"] - query_seconds_before,
+            "samples": sampler.samples,
+            "sample_interval_seconds": ProfilingSettings.INTERVAL_SECONDS,
+        })
+        try:
+            write_profile(report, sampler.stacks)
+        except OSError as e:
+            logger.error(f"Could not write profile {report['profile_id']}: {e}")
+
+
+@contextmanager
+def profile_endpoint_thread(name: str):
+    # Sync endpoints run on a threadpool thread picked per call, that thread joins the sampled
+    # set while it runs this request, so concurrent requests stay out of the profile
+    thread_ids = set()
+    token = _profiled_thread_ids.set(thread_ids)
+    try:
+        with profile(name, thread_ids) as report:
+            report["scope"] = "endpoint_thread"
+            yield report
+    finally:
+        _profiled_thread_ids.reset(token)
+
+
+def join_request_profile(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        thread_ids = _profiled_thread_ids.get()
+        if thread_ids is None:
+            return endpoint(*args, **kwargs)
+        thread_ids.add(threading.get_ident())
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            thread_ids.discard(threading.get_ident())
+
+    wrapper.joins_request_profile = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router re-creates routes with the already wrapped endpoint
+        if not asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "joins_request_profile", False):
+            endpoint = join_request_profile(endpoint)
+        super().__init__(path, endpoint, **kwargs)
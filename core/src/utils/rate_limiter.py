@@ -0,0 +1,167 @@
+import email.utils
+import fcntl
+import json
+import logging
+import os
+import time
+import uuid
+
+from contextlib import contextmanager
+
+from src.settings.settings import RateLimitSettings
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(headers):
+    if headers is None:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_date.timestamp() - time.time(), 0.0)
+
+
+class SharedRateLimiter:
+    """Token buckets for requests and tokens plus an AIMD concurrency window, kept in a
+    flock-protected file so every core process on the host draws from the same quota."""
+
+    def __init__(self, state_path: str = RateLimitSettings.STATE_PATH,
+                 requests_per_minute: int = RateLimitSettings.REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = RateLimitSettings.TOKENS_PER_MINUTE):
+        self.state_path = state_path
+        self.lock_path = f"{state_path}.lock"
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        if os.path.dirname(state_path):
+            os.makedirs(os.path.dirname(state_path), exist_ok=True)
+
+    @contextmanager
+    def _locked_state(self):
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = self._read_state()
+                yield state
+                self._write_state(state)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_state(self):
+        now = time.time()
+        try:
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            state = {
+                "request_tokens": float(self.requests_per_minute),
+                "token_tokens": float(self.tokens_per_minute),
+                "updated_at": now,
+                "blocked_until": 0.0,
+                "concurrency_limit": RateLimitSettings.INITIAL_CONCURRENCY,
+                "slots": {},
+            }
+
+        elapsed = max(now - state["updated_at"], 0.0)
+        state["request_tokens"] = min(
+            float(self.requests_per_minute),
+            state["request_tokens"] + elapsed * self.requests_per_minute / 60
+        )
+        state["token_tokens"] = min(
+            float(self.tokens_per_minute),
+            state["token_tokens"] + elapsed * self.tokens_per_minute / 60
+        )
+        state["updated_at"] = now
+        # Slots of crashed processes expire instead of shrinking the window forever
+        state["slots"] = {slot_id: expires_at for slot_id, expires_at in state["slots"].items() if expires_at > now}
+        return state
+
+    def _write_state(self, state):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def acquire(self, estimated_tokens: int):
+        estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        while True:
+            with self._locked_state() as state:
+                now = time.time()
+                wait_seconds = 0.0
+                if state["blocked_until"] > now:
+                    wait_seconds = state["blocked_until"] - now
+                elif len(state["slots"]) >= int(state["concurrency_limit"]):
+                    wait_seconds = RateLimitSettings.MAX_WAIT_STEP_SECONDS / 10
+                elif state["request_tokens"] < 1:
+                    wait_seconds = (1 - state["request_tokens"]) * 60 / self.requests_per_minute
+                elif state["token_tokens"] < estimated_tokens:
+                    wait_seconds = (estimated_tokens - state["token_tokens"]) * 60 / self.tokens_per_minute
+                else:
+                    slot_id = uuid.uuid4().hex
+                    state["slots"][slot_id] = now + RateLimitSettings.SLOT_LEASE_SECONDS
+                    state["request_tokens"] -= 1
+                    state["token_tokens"] -= estimated_tokens
+                    return slot_id
+
+            time.sleep(min(wait_seconds, RateLimitSettings.MAX_WAIT_STEP_SECONDS))
+
+    def release(self, slot_id: str, estimated_tokens: int, used_tokens: int | None = None,
+                throttled: bool = False, retry_after: float | None = None, failed: bool = False):
+        estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        with self._locked_state() as state:
+            now = time.time()
+            lease_expires_at = state["slots"].pop(slot_id, None)
+            if used_tokens is not None:
+                # Give back (or take) the difference between the estimate and the real usage
+                state["token_tokens"] = min(
+                    float(self.tokens_per_minute),
+                    state["token_tokens"] + estimated_tokens - used_tokens
+                )
+
+            limit = state["concurrency_limit"]
+            if throttled:
+                retry_after = retry_after if retry_after is not None else RateLimitSettings.DEFAULT_RETRY_AFTER_SECONDS
+                state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+                # One decrease per congestion event: 429s of requests already in flight when the
+                # window last shrank belong to that same event
+                started_at = lease_expires_at - RateLimitSettings.SLOT_LEASE_SECONDS if lease_expires_at else now
+                if started_at >= state.get("last_decrease_at", 0.0):
+                    state["concurrency_limit"] = max(
+                        RateLimitSettings.MIN_CONCURRENCY, limit * RateLimitSettings.MULTIPLICATIVE_DECREASE
+                    )
+                    state["last_decrease_at"] = now
+                    logger.warning(
+                        f"LLM throttled, pausing {retry_after:.1f}s and shrinking concurrency "
+                        f"{limit:.1f} -> {state['concurrency_limit']:.1f}"
+                    )
+            elif not failed:
+                # Only successes grow the window, errors leave it where it is
+                state["concurrency_limit"] = min(
+                    RateLimitSettings.MAX_CONCURRENCY, limit + RateLimitSettings.ADDITIVE_INCREASE / limit
+                )
+
+    def snapshot(self):
+        with self._locked_state() as state:
+            return {
+                "request_tokens": state["request_tokens"],
+                "token_tokens": state["token_tokens"],
+                "concurrency_limit": state["concurrency_limit"],
+                "in_flight": len(state["slots"]),
+                "blocked_for_seconds": max(state["blocked_until"] - time.time(), 0.0),
+            }
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import re
+
+from typing import Dict
+
+from src.settings.settings import EvaluatorSettings, GeneralCoreSettings, OpenAISettings
+
+_CANDIDATE_ID_RE = re.compile(r"Candidate id (\d+):")
+_FENCED_TEXT_RE = re.compile(r"```\s*(.*?)\s*```", re.DOTALL)
+
+
+def stable_number(text: str, modulo: int):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % modulo
+
+
+def stand_in_completion(request_body: Dict):
+    """Deterministic offline answer for a chat completion request built by RecruitmentOpenAI."""
+    messages = request_body["messages"]
+    system_content = messages[0]["content"]
+    prompt = "\n".join(message["content"] for message in messages[1:])
+
+    if system_content == OpenAISettings.SYSTEM_CONTENT_FOR_PARAGRAPH_CORRECTION_PROMPT:
+        fenced_text = _FENCED_TEXT_RE.search(prompt)
+        return fenced_text.group(1) if fenced_text else prompt
+
+    if system_content == OpenAISettings.SYSTEM_CONTENT_FOR_EVALUATION:
+        candidate_ids = [int(candidate_id) for candidate_id in _CANDIDATE_ID_RE.findall(prompt)]
+        if candidate_ids:
+            return json.dumps({EvaluatorSettings.EVALUATIONS: [
+                {
+                    EvaluatorSettings.CANDIDATE_ID: candidate_id,
+                    GeneralCoreSettings.SCORE: stable_number(f"{candidate_id}{prompt}", 101),
+                    GeneralCoreSettings.SUMMARY_REASON: f"Stand-in evaluation of candidate {candidate_id}.",
+                }
+                for candidate_id in candidate_ids
+            ]})
+        return json.dumps({
+            GeneralCoreSettings.SCORE: stable_number(prompt, 101),
+            GeneralCoreSettings.SUMMARY_REASON: "Stand-in evaluation.",
+        })
+
+    fields = [
+        GeneralCoreSettings.EXTRACT_OBJECTIVE,
+        GeneralCoreSettings.EXTRACT_EXPERIENCES,
+        GeneralCoreSettings.EXTRACT_SKILLS,
+        GeneralCoreSettings.EXTRACT_EDUCATION,
+        GeneralCoreSettings.EXTRACT_CERTIFICATE,
+    ]
+    fenced_text = _FENCED_TEXT_RE.search(prompt)
+    cv_text = fenced_text.group(1) if fenced_text else prompt
+    return json.dumps({field: f"Stand-in {field} from {len(cv_text)} characters." for field in fields})
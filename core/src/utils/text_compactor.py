@@ -0,0 +1,144 @@
+import logging
+import math
+import re
+import unicodedata
+
+from collections import Counter
+from typing import List
+from pydantic import BaseModel
+
+from src.settings.settings import OpenAISettings, TextCompactionSettings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"[^\S\n]+")
+_PAGE_NUMBER_RE = re.compile(
+    r"^((page|trang)\s*\d+(\s*(/|of|trên)\s*\d+)?|\d+\s*(/|of|trên)\s*\d+|[-–]\s*\d+\s*[-–])$",
+    re.IGNORECASE
+)
+_DIGITS_RE = re.compile(r"\d+")
+
+_encoding = None
+
+
+def get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.encoding_for_model(OpenAISettings.MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+
+def normalize_prompt(text: str):
+    # Byte-stable prompt text: no CRLF, no trailing spaces, no leading/trailing blank lines
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+def count_tokens(text: str):
+    encoding = get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / TextCompactionSettings.APPROX_CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int):
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * TextCompactionSettings.APPROX_CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+class CompactionResult(BaseModel):
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    truncated: bool
+
+    @property
+    def saved_tokens(self):
+        return self.original_tokens - self.compacted_tokens
+
+
+def normalize_line(line: str):
+    # NFKC folds ligatures and full-width forms and keeps Vietnamese letters composed
+    line = unicodedata.normalize("NFKC", line)
+    line = "".join(
+        char for char in line
+        if char == "\t" or not unicodedata.category(char).startswith("C")
+    )
+    return _WHITESPACE_RE.sub(" ", line).strip()
+
+
+def is_noise_line(line: str):
+    """
+    >>> [is_noise_line(line) for line in ["• C++", "- C#", "• R", "Page 2 of 3", "~~|#|~~ 1", "2019 - 2021"]]
+    [False, False, False, True, True, False]
+    """
+    if _PAGE_NUMBER_RE.match(line):
+        return True
+    # Any letter keeps the line, short skill bullets like "• C++" are mostly symbols
+    if any(char.isalpha() for char in line):
+        return False
+    alnum_chars = sum(char.isalnum() for char in line)
+    return alnum_chars / len(line) < TextCompactionSettings.NOISE_MIN_ALNUM_RATIO
+
+
+def boilerplate_key(line: str):
+    # Footers differ only by their page number, "Page 1" and "Page 2" share a key
+    return _DIGITS_RE.sub("#", line.lower())
+
+
+def compact_pages(page_texts: List[str]):
+    pages = [
+        [line for line in map(normalize_line, page_text.splitlines()) if line and not is_noise_line(line)]
+        for page_text in page_texts
+    ]
+
+    boilerplate = set()
+    if len(pages) >= 2:
+        min_pages = max(2, math.ceil(len(pages) * TextCompactionSettings.BOILERPLATE_MIN_PAGE_RATIO))
+        page_counts = Counter(key for page in pages for key in {boilerplate_key(line) for line in page})
+        boilerplate = {key for key, count in page_counts.items() if count >= min_pages}
+
+    # The first occurrence stays, it may be a name or a section heading
+    seen = set()
+    compacted_pages = []
+    for page in pages:
+        compacted_lines = []
+        for line in page:
+            key = boilerplate_key(line)
+            if key in boilerplate and key in seen:
+                continue
+            seen.add(key)
+            compacted_lines.append(line)
+        compacted_pages.append("\n".join(compacted_lines))
+
+    return "\n\n".join(compacted_pages).strip()
+
+
+def compact_cv_text(page_texts: List[str], max_tokens: int = TextCompactionSettings.MAX_PROMPT_TOKENS):
+    original_text = "\n".join(page_texts)
+    original_tokens = count_tokens(original_text)
+
+    compacted_text = compact_pages(page_texts) if TextCompactionSettings.ENABLED else original_text
+    compacted_tokens = count_tokens(compacted_text)
+
+    truncated = compacted_tokens > max_tokens
+    if truncated:
+        compacted_text = truncate_to_tokens(compacted_text, max_tokens)
+        compacted_tokens = count_tokens(compacted_text)
+
+    return CompactionResult(
+        text=compacted_text,
+        original_tokens=original_tokens,
+        compacted_tokens=compacted_tokens,
+        truncated=truncated,
+    )
@@ -0,0 +1,37 @@
+import threading
+
+from collections import defaultdict
+
+
+class UsageTracker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage = defaultdict(lambda: {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "cached_prompt_tokens": 0,
+            "completion_tokens": 0,
+        })
+
+    def record(self, usage_key: str, prompt_tokens: int, cached_prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            usage = self._usage[usage_key]
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["cached_prompt_tokens"] += cached_prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+
+    def snapshot(self, usage_key: str):
+        with self._lock:
+            return dict(self._usage.get(usage_key) or self._usage.default_factory())
+
+    def report(self, usage_key: str, since: dict | None = None):
+        # Totals are per process and cumulative, pass an earlier snapshot to get one run's share
+        usage = self.snapshot(usage_key)
+        if since is not None:
+            usage = {name: value - since.get(name, 0) for name, value in usage.items()}
+        usage["cache_hit_ratio"] = (
+            usage["cached_prompt_tokens"] / usage["prompt_tokens"] if usage["prompt_tokens"] else 0.0
+        )
+        return usage